@@ -0,0 +1,79 @@
+from __future__ import annotations
+from typing import TypeVar, Generic, List, Sequence
+import numpy as np
+
+V = TypeVar('V')  # Vertex type
+
+
+class CSRGraph(Generic[V]):
+    """Compressed sparse row copy of a graph's adjacency.
+
+    The edges of vertex i are targets[offsets[i]:offsets[i + 1]] with the
+    matching weights, so neighbour lookups are array slices instead of
+    lists of Edge objects.
+    """
+
+    def __init__(self, offsets: np.ndarray, targets: np.ndarray,
+                 weights: np.ndarray, vertices: Sequence[V]):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self._vertices = vertices
+
+    @classmethod
+    def from_graph(cls, graph) -> CSRGraph[V]:
+        """Build the CSR arrays from a Graph. Unweighted edges get weight 1."""
+        edge_lists = [graph.edges_for_index(i) for i in range(graph.vertex_count)]
+        offsets: np.ndarray = np.zeros(len(edge_lists) + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in edge_lists], out=offsets[1:])
+        targets: np.ndarray = np.fromiter((edge.v for edges in edge_lists for edge in edges),
+                                          dtype=index_dtype(len(edge_lists)), count=offsets[-1])
+        weights: np.ndarray = np.fromiter((getattr(edge, 'weight', 1.0)
+                                           for edges in edge_lists for edge in edges),
+                                          dtype=np.float64, count=offsets[-1])
+        return cls(offsets, targets, weights, [graph.vertex_at(i) for i in range(graph.vertex_count)])
+
+    @property
+    def vertex_count(self) -> int:
+        """Get number of vertices."""
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self) -> int:
+        """Get number of edges."""
+        return int(self.offsets[-1])
+
+    def degrees(self) -> np.ndarray:
+        """Get the number of edges of every vertex."""
+        return np.diff(self.offsets)
+
+    def edge_sources(self) -> np.ndarray:
+        """Get the source vertex of every edge, parallel to targets."""
+        return np.repeat(np.arange(self.vertex_count, dtype=self.targets.dtype), self.degrees())
+
+    def vertex_at(self, index: int) -> V:
+        """Get the vertex at the given index."""
+        return self._vertices[index]
+
+    def index_of(self, vertex: V) -> int:
+        """Get the index of the given vertex."""
+        return self._vertices.index(vertex)
+
+    def neighbors_for_index(self, index: int) -> np.ndarray:
+        """Get the indices of the vertices connected to the given index."""
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def weights_for_index(self, index: int) -> np.ndarray:
+        """Get the weights of the edges of the given index."""
+        return self.weights[self.offsets[index]:self.offsets[index + 1]]
+
+    def __str__(self):
+        lines: List[str] = [f'{self.vertex_at(i)} -> '
+                            f'{[self.vertex_at(j) for j in self.neighbors_for_index(i)]}'
+                            for i in range(self.vertex_count)]
+        return '\n'.join(lines)
+
+
+def index_dtype(vertex_count: int) -> np.dtype:
+    """Smallest signed integer type that can hold every vertex index and -1."""
+    return np.dtype(np.int32) if vertex_count < 2 ** 31 else np.dtype(np.int64)
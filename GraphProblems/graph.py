@@ -1,5 +1,6 @@
-﻿from typing import TypeVar, Generic, List, Optional
+﻿from typing import TypeVar, Generic, List, Optional, Iterator
 from edge import Edge
+from union_find import UnionFind
 
 V = TypeVar('V')  # Vertex type
 
@@ -10,6 +11,8 @@ class Graph(Generic[V]):
             vertices = []
         self._vertices = vertices
         self._edges: List[List[Edge]] = [[] for _ in vertices]
+        self._version: int = 0
+        self._components: UnionFind = UnionFind(len(vertices))
 
     @property
     def vertex_count(self) -> int:
@@ -21,11 +24,19 @@ class Graph(Generic[V]):
         """Get number of edges."""
         return sum(len(edge) for edge in self._edges)
 
+    @property
+    def version(self) -> int:
+        """Counter bumped by every change to the graph, used to tell
+        whether results computed earlier are still valid."""
+        return self._version
+
     def add_vertex(self, vertex: V) -> int:
         """Add the vertex to the graph and returns its
         index as int."""
         self._vertices.append(vertex)
         self._edges.append([])
+        self._components.add()
+        self._version += 1
         return self.vertex_count - 1
 
     def add_edge(self, edge: Edge):
@@ -33,6 +44,8 @@ class Graph(Generic[V]):
         both directions."""
         self._edges[edge.u].append(edge)
         self._edges[edge.v].append(edge.reversed())
+        self._components.union(edge.u, edge.v)
+        self._version += 1
 
     def add_edge_by_indices(self, u: int, v: int):
         """Add edge between vertex u and vertex v."""
@@ -58,6 +71,11 @@ class Graph(Generic[V]):
         the given index by an edge."""
         return [self.vertex_at(edge.v) for edge in self._edges[index]]
 
+    def neighbor_indices(self, index: int) -> Iterator[int]:
+        """Iterate over the indices of the vertices connected to the
+        vertex at the given index, without building a list."""
+        return (edge.v for edge in self._edges[index])
+
     def neighbors_for_vertex(self, vertex: V) -> List[V]:
         """Get a list of vertices connected to the given vertex."""
         return self.neighbors_for_index(self.index_of(vertex))
@@ -70,6 +88,23 @@ class Graph(Generic[V]):
         """Get a list of edges for the given vertex."""
         return self.edges_for_index(self.index_of(vertex))
 
+    @property
+    def component_count(self) -> int:
+        """Get number of connected components."""
+        return self._components.count
+
+    def connected_by_indices(self, u: int, v: int) -> bool:
+        """Check whether a path exists between vertex u and vertex v."""
+        return self._components.connected(u, v)
+
+    def connected_by_vertices(self, first: V, second: V) -> bool:
+        """Check whether a path exists between the two vertices."""
+        return self.connected_by_indices(self.index_of(first), self.index_of(second))
+
+    def components(self) -> List[List[V]]:
+        """Get the vertices of each connected component."""
+        return [[self.vertex_at(i) for i in group] for group in self._components.groups()]
+
     def __str__(self):
         """Return a string that shows each vertex and the neighbors 
         it shares an edge with."""
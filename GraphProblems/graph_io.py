@@ -0,0 +1,238 @@
+"""Binary on-disk format for graphs.
+
+Layout, little endian, every section starting on an 8 byte boundary:
+
+    header         magic, format version, index width, vertex and edge count
+    offsets        int64[vertex_count + 1]
+    targets        int32 or int64[edge_count]
+    weights        float64[edge_count]
+    label offsets  int64[vertex_count + 1]
+    labels         utf-8 bytes of every vertex label back to back
+
+Loading maps the file read-only and hands out NumPy views of it, so even a
+huge graph is ready at once and worker processes that load the same file
+share its pages through the OS page cache.
+"""
+from __future__ import annotations
+from typing import Sequence, Iterator, Dict, List, Tuple, Union, BinaryIO, Optional
+from mmap import mmap, ACCESS_READ
+import os
+import struct
+import tempfile
+import numpy as np
+
+from csr import CSRGraph, index_dtype
+from graph import Graph
+
+MAGIC = b'CSRG'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQ')
+HEADER_SIZE = 64
+EDGE_RECORD = np.dtype([('u', '<i8'), ('v', '<i8'), ('weight', '<f8')])
+
+
+def _aligned(position: int) -> int:
+    return (position + 7) // 8 * 8
+
+
+def _section_offsets(vertex_count: int, edge_count: int, index_width: int) -> Tuple[int, int, int, int, int]:
+    """Byte offsets of offsets, targets, weights, label offsets and labels."""
+    offsets_at: int = HEADER_SIZE
+    targets_at: int = offsets_at + 8 * (vertex_count + 1)
+    weights_at: int = _aligned(targets_at + index_width * edge_count)
+    label_offsets_at: int = weights_at + 8 * edge_count
+    labels_at: int = label_offsets_at + 8 * (vertex_count + 1)
+    return offsets_at, targets_at, weights_at, label_offsets_at, labels_at
+
+
+class LabelTable(Sequence[str]):
+    """Vertex labels decoded on demand from the mapped file."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+        self._indices: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('label index out of range')
+        return bytes(self._data[self._offsets[index]:self._offsets[index + 1]]).decode()
+
+    def index(self, label: str, *args) -> int:
+        """Index of the label. The lookup table is built on first use."""
+        if self._indices is None:
+            self._indices = {}
+            for i in range(len(self)):
+                self._indices.setdefault(self[i], i)
+        try:
+            return self._indices[label]
+        except KeyError:
+            raise ValueError(f'{label!r} is not a vertex') from None
+
+
+def _write_labels(file: BinaryIO, labels: Iterator[str], vertex_count: int):
+    encoded: List[bytes] = [str(label).encode() for label in labels]
+    label_offsets: np.ndarray = np.zeros(vertex_count + 1, dtype='<i8')
+    np.cumsum([len(label) for label in encoded], out=label_offsets[1:])
+    file.write(label_offsets.tobytes())
+    for label in encoded:
+        file.write(label)
+
+
+def save_graph(graph: Union[Graph, CSRGraph], path: str):
+    """Write a Graph or CSRGraph to path. Labels are stored as str(vertex)."""
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_graph(graph)
+    vertex_count: int = graph.vertex_count
+    edge_count: int = graph.edge_count
+    targets: np.ndarray = graph.targets.astype(index_dtype(vertex_count).newbyteorder('<'), copy=False)
+    offsets_at, targets_at, weights_at, _, _ = _section_offsets(vertex_count, edge_count, targets.itemsize)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, targets.itemsize, vertex_count, edge_count))
+        file.seek(offsets_at)
+        file.write(graph.offsets.astype('<i8', copy=False).tobytes())
+        file.write(targets.tobytes())
+        file.write(bytes(weights_at - file.tell()))
+        file.write(graph.weights.astype('<f8', copy=False).tobytes())
+        _write_labels(file, (graph.vertex_at(i) for i in range(vertex_count)), vertex_count)
+
+
+def load_graph(path: str) -> CSRGraph[str]:
+    """Memory-map a graph written by save_graph or import_edge_list.
+
+    The returned arrays are read-only views into the mapping, nothing is
+    copied.
+    """
+    with open(path, 'rb') as file:
+        mapping: mmap = mmap(file.fileno(), 0, access=ACCESS_READ)
+    magic, version, index_width, vertex_count, edge_count = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'{path} is not a version {FORMAT_VERSION} graph file')
+
+    offsets_at, targets_at, weights_at, label_offsets_at, labels_at = _section_offsets(
+        vertex_count, edge_count, index_width)
+    offsets = np.frombuffer(mapping, '<i8', vertex_count + 1, offsets_at)
+    targets = np.frombuffer(mapping, f'<i{index_width}', edge_count, targets_at)
+    weights = np.frombuffer(mapping, '<f8', edge_count, weights_at)
+    label_offsets = np.frombuffer(mapping, '<i8', vertex_count + 1, label_offsets_at)
+    labels = np.frombuffer(mapping, np.uint8, int(label_offsets[-1]), labels_at)
+    return CSRGraph(offsets, targets, weights, LabelTable(label_offsets, labels))
+
+
+def _read_edge_chunks(path: str, chunk_lines: int, comment: str) -> Iterator[Tuple[List[str], List[str], List[float]]]:
+    """Yield the edges of an edge-list file a chunk of lines at a time."""
+    firsts: List[str] = []
+    seconds: List[str] = []
+    weights: List[float] = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            fields: List[str] = line.split()
+            if not fields or fields[0].startswith(comment):
+                continue
+            if len(fields) < 2:
+                raise ValueError(f'edge line needs two vertices: {line!r}')
+            firsts.append(fields[0])
+            seconds.append(fields[1])
+            weights.append(float(fields[2]) if len(fields) > 2 else 1.0)
+            if len(firsts) == chunk_lines:
+                yield firsts, seconds, weights
+                firsts, seconds, weights = [], [], []
+    if firsts:
+        yield firsts, seconds, weights
+
+
+def import_edge_list(text_path: str, path: str, chunk_lines: int = 1_000_000, comment: str = '#'):
+    """Convert an edge-list text file into the binary format.
+
+    Each line holds two vertex labels and an optional weight. Like
+    Graph.add_edge every edge is stored in both directions. The text is
+    read once in chunks: labels are numbered as they appear and the edges
+    are spooled to a temporary binary file next to path, then scattered
+    chunk by chunk into the mapped output.
+    """
+    indices: Dict[str, int] = {}
+    degrees: np.ndarray = np.zeros(1024, dtype=np.int64)
+    spool_file, spool_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(spool_file, 'wb') as spool:
+            for firsts, seconds, weights in _read_edge_chunks(text_path, chunk_lines, comment):
+                records: np.ndarray = np.empty(len(firsts), dtype=EDGE_RECORD)
+                records['u'] = [indices.setdefault(label, len(indices)) for label in firsts]
+                records['v'] = [indices.setdefault(label, len(indices)) for label in seconds]
+                records['weight'] = weights
+                if len(indices) > len(degrees):
+                    degrees = np.concatenate([degrees, np.zeros(max(len(degrees), len(indices)),
+                                                                dtype=np.int64)])
+                degrees += np.bincount(records['u'], minlength=len(degrees))
+                degrees += np.bincount(records['v'], minlength=len(degrees))
+                spool.write(records.tobytes())
+
+        vertex_count: int = len(indices)
+        offsets: np.ndarray = np.zeros(vertex_count + 1, dtype='<i8')
+        np.cumsum(degrees[:vertex_count], out=offsets[1:])
+        edge_count: int = int(offsets[-1])
+        targets_dtype: np.dtype = index_dtype(vertex_count).newbyteorder('<')
+        offsets_at, targets_at, weights_at, label_offsets_at, _ = _section_offsets(
+            vertex_count, edge_count, targets_dtype.itemsize)
+
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, targets_dtype.itemsize, vertex_count, edge_count))
+            file.seek(offsets_at)
+            file.write(offsets.tobytes())
+            file.truncate(label_offsets_at)
+
+        if edge_count:
+            targets = np.memmap(path, targets_dtype, 'r+', targets_at, (edge_count,))
+            weights = np.memmap(path, '<f8', 'r+', weights_at, (edge_count,))
+            fill: np.ndarray = offsets[:-1].copy()
+            spooled = np.memmap(spool_path, EDGE_RECORD, 'r')
+            for start in range(0, len(spooled), chunk_lines):
+                chunk: np.ndarray = spooled[start:start + chunk_lines]
+                _scatter(np.concatenate([chunk['u'], chunk['v']]),
+                         np.concatenate([chunk['v'], chunk['u']]),
+                         np.concatenate([chunk['weight'], chunk['weight']]),
+                         fill, targets, weights)
+            targets.flush()
+            weights.flush()
+            del targets, weights, spooled
+    finally:
+        os.remove(spool_path)
+
+    with open(path, 'ab') as file:
+        _write_labels(file, iter(indices), vertex_count)
+
+
+def _scatter(sources: np.ndarray, destinations: np.ndarray, weights: np.ndarray,
+             fill: np.ndarray, out_targets: np.ndarray, out_weights: np.ndarray):
+    """Place a batch of edges into their vertices' CSR slices.
+
+    fill holds the next free slot of every vertex and is advanced in place.
+    """
+    order: np.ndarray = np.argsort(sources, kind='stable')
+    sources = sources[order]
+    vertices, first, counts = np.unique(sources, return_index=True, return_counts=True)
+    rank: np.ndarray = np.arange(len(sources)) - np.repeat(first, counts)
+    positions: np.ndarray = fill[sources] + rank
+    out_targets[positions] = destinations[order]
+    out_weights[positions] = weights[order]
+    fill[vertices] += counts
+
+
+if __name__ == "__main__":
+    city_graph: Graph[str] = Graph(["Seattle", "San Francisco", "Los Angeles", "Riverside", "Phoenix"])
+    city_graph.add_edge_by_vertices("Seattle", "San Francisco")
+    city_graph.add_edge_by_vertices("San Francisco", "Riverside")
+    city_graph.add_edge_by_vertices("San Francisco", "Los Angeles")
+    city_graph.add_edge_by_vertices("Los Angeles", "Riverside")
+    city_graph.add_edge_by_vertices("Los Angeles", "Phoenix")
+    city_graph.add_edge_by_vertices("Riverside", "Phoenix")
+
+    save_graph(city_graph, 'city_graph.csrg')
+    print(load_graph('city_graph.csrg'))
+    os.remove('city_graph.csrg')
@@ -1,37 +1,221 @@
-﻿from typing import Union, List, Tuple, Set
+﻿from typing import Union, List, Tuple, Set, Dict, Optional, Callable
+from heapq import heappush, heappop
+from math import inf
 from graph import Graph, V
+from edge import Edge
+from path_cache import PathCache
 from SearchProblems.data_structures import Stack, Queue, PriorityQueue
-from SearchProblems.maze import Node
+from SearchProblems.generic_search import Node, SearchStats, search
 
 Path = List[str]
 
 
+def edge_weight(edge: Edge) -> float:
+    """Weight of the edge, unweighted edges count as 1."""
+    return getattr(edge, 'weight', 1.0)
+
+
 class SearchableGraph(Graph):
+    def __init__(self, vertices: List[V] = None):
+        super().__init__(vertices)
+        self.path_cache: Optional[PathCache[V]] = None
+        self.stats: Optional[SearchStats] = None  # Of the last search() call.
+
+    def enable_path_cache(self, capacity: int = 1_000_000, cache_trees: bool = False) -> PathCache[V]:
+        """Answer bfs queries from a bounded cache from now on.
+
+        The cache is emptied automatically whenever the graph changes.
+        See PathCache for the meaning of the arguments.
+        """
+        self.path_cache = PathCache(self, capacity, cache_trees)
+        return self.path_cache
+
+    def disable_path_cache(self):
+        self.path_cache = None
+
     def search(self, collection_type: Union[Stack, Queue], start: V, end: V) -> Path or None:
+        node, self.stats = search(start, lambda vertex: vertex == end, self.neighbors_for_vertex,
+                                  collection_type())
+        return node
+
+    def index_search(self, collection_type: Union[Stack, Queue], start: V, end: V) -> Optional[Node[V]]:
+        """Same search as search() but over vertex indices.
+
+        Parents and depths live in flat lists indexed by vertex instead of
+        a Node per pushed vertex, and neighbours are read straight off the
+        edge lists, so an expansion allocates nothing. Nodes are only
+        built for the path that was found.
+        """
+        source: int = self.index_of(start)
+        target: int = self.index_of(end)
+        parents: List[int] = [-1] * self.vertex_count
+        depths: List[int] = [-1] * self.vertex_count  # -1 marks unexplored.
+        depths[source] = 0
         frontier = collection_type()
-        n: Node[V] = Node(start, None)
-        frontier.push(n)
-        explored: Set[V] = {start}
+        frontier.push(source)
 
         while not frontier.empty:
-            current_node: Node[V] = frontier.pop()
-            current_state: V = current_node.state
-
-            if end ==  current_state:
-                return current_node
-            # print('for child in: ', current_vertex)
-            for child in self.neighbors_for_vertex(current_state):
-                if child in explored:
+            current: int = frontier.pop()
+            if current == target:
+                return self._node_chain(current, parents, depths)
+            depth: int = depths[current] + 1
+            for child in self.neighbor_indices(current):
+                if depths[child] >= 0:
                     continue
-                explored.add(child)
+                depths[child] = depth
+                parents[child] = current
+                frontier.push(child)
+        return None
 
-                frontier.push(Node(child, current_node))
+    def _node_chain(self, index: int, parents: List[int], costs: List[float]) -> Node[V]:
+        """Build the Node chain ending at index from parent and cost lists."""
+        indices: List[int] = [index]
+        while parents[indices[-1]] >= 0:
+            indices.append(parents[indices[-1]])
+        node: Optional[Node[V]] = None
+        for index in reversed(indices):
+            node = Node(self.vertex_at(index), node, costs[index])
+        return node
 
     def dfs(self, start: V, end: V) -> Path or None:
-        return self.search(Stack, start, end)
+        return self.index_search(Stack, start, end)
 
     def bfs(self, start: V, end: V):
-        return self.search(Queue, start, end)
+        if self.path_cache is not None:
+            return self.path_cache.bfs(start, end)
+        return self.index_search(Queue, start, end)
+
+    def bidirectional_bfs(self, start: V, end: V) -> Optional[Node[V]]:
+        """Breadth-first search from both ends at once.
+
+        The smaller frontier is expanded one whole level at a time and the
+        search stops as soon as the two sides touch, which gives a path as
+        short as bfs's while exploring far fewer vertices.
+        """
+        source: int = self.index_of(start)
+        target: int = self.index_of(end)
+        if source == target:
+            return Node(start, None)
+
+        forward: Dict[int, Optional[int]] = {source: None}
+        backward: Dict[int, Optional[int]] = {target: None}
+        forward_frontier: List[int] = [source]
+        backward_frontier: List[int] = [target]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand_level(forward_frontier, forward, backward)
+            else:
+                backward_frontier, meeting = self._expand_level(backward_frontier, backward, forward)
+            if meeting is not None:
+                return self._join_paths(meeting, forward, backward)
+        return None
+
+    def _expand_level(self, frontier: List[int], parents: Dict[int, Optional[int]],
+                      other: Dict[int, Optional[int]]) -> Tuple[List[int], Optional[int]]:
+        """Expand every vertex of one bfs level, stopping at the first
+        vertex already reached by the other side."""
+        next_frontier: List[int] = []
+        for u in frontier:
+            for edge in self._edges[u]:
+                v: int = edge.v
+                if v in parents:
+                    continue
+                parents[v] = u
+                if v in other:
+                    return next_frontier, v
+                next_frontier.append(v)
+        return next_frontier, None
+
+    def bidirectional_astar(self, start: V, end: V,
+                            heuristic: Optional[Callable[[V, V], float]] = None) -> Optional[Node[V]]:
+        """A* from both ends at once over edge weights.
+
+        heuristic(a, b) must be a consistent estimate of the distance between
+        any two vertices. Both searches use the average of the forward and
+        backward estimates as potential so they see the same reduced edge
+        costs, which lets the search stop once the two smallest frontier
+        keys add up to the best meeting found. Without a heuristic this is
+        bidirectional Dijkstra.
+        """
+        source: int = self.index_of(start)
+        target: int = self.index_of(end)
+        if source == target:
+            return Node(start, None)
+
+        if heuristic is None:
+            def potential(index: int) -> float:
+                return 0.0
+        else:
+            def potential(index: int) -> float:
+                vertex: V = self.vertex_at(index)
+                return (heuristic(vertex, end) - heuristic(start, vertex)) / 2
+
+        # Index 0 is the search from start, index 1 the search from end.
+        keys: List[Dict[int, float]] = [{source: 0.0}, {target: 0.0}]
+        costs: List[Dict[int, float]] = [{source: 0.0}, {target: 0.0}]
+        parents: List[Dict[int, Optional[int]]] = [{source: None}, {target: None}]
+        frontiers: List[List[Tuple[float, int]]] = [[(0.0, source)], [(0.0, target)]]
+        best: float = inf
+        meeting: Optional[int] = None
+
+        while frontiers[0] and frontiers[1]:
+            if frontiers[0][0][0] + frontiers[1][0][0] >= best:
+                break
+            side: int = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            sign: int = 1 if side == 0 else -1
+            key, u = heappop(frontiers[side])
+            if key > keys[side][u]:
+                continue  # Stale entry.
+
+            u_potential: float = potential(u)
+            for edge in self._edges[u]:
+                v: int = edge.v
+                weight: float = edge_weight(edge)
+                new_key: float = key + weight + sign * (potential(v) - u_potential)
+                if v in keys[side] and keys[side][v] <= new_key:
+                    continue
+                keys[side][v] = new_key
+                costs[side][v] = costs[side][u] + weight
+                parents[side][v] = u
+                heappush(frontiers[side], (new_key, v))
+                if v in keys[1 - side] and new_key + keys[1 - side][v] < best:
+                    best = new_key + keys[1 - side][v]
+                    meeting = v
+
+        if meeting is None:
+            return None
+        return self._join_paths(meeting, parents[0], parents[1], costs[0], costs[1])
+
+    def _join_paths(self, meeting: int, forward: Dict[int, Optional[int]],
+                    backward: Dict[int, Optional[int]],
+                    forward_costs: Optional[Dict[int, float]] = None,
+                    backward_costs: Optional[Dict[int, float]] = None) -> Node[V]:
+        """Join the two halves of a bidirectional search into one
+        chain of nodes from start to end."""
+        indices: List[int] = []
+        index: Optional[int] = meeting
+        while index is not None:
+            indices.append(index)
+            index = forward[index]
+        indices.reverse()
+        halfway: int = len(indices)
+        index = backward[meeting]
+        while index is not None:
+            indices.append(index)
+            index = backward[index]
+
+        if forward_costs is None:
+            step_costs: List[float] = [float(i) for i in range(len(indices))]
+        else:
+            total: float = forward_costs[meeting] + backward_costs[meeting]
+            step_costs = ([forward_costs[i] for i in indices[:halfway]] +
+                          [total - backward_costs[i] for i in indices[halfway:]])
+
+        node: Optional[Node[V]] = None
+        for index, cost in zip(indices, step_costs):
+            node = Node(self.vertex_at(index), node, cost)
+        return node
 
     def retrace_node_path(self, node: Node[V]) -> List[V]:
         """Trace the node's parents and returns  list of all nodes it took
@@ -79,3 +263,4 @@ if __name__ == "__main__":
     result = city_graph.bfs('Boston', 'Phoenix')
     path = city_graph.retrace_node_path(result)
     print(path)
+    print(city_graph.retrace_node_path(city_graph.bidirectional_bfs('Boston', 'Phoenix')))
@@ -0,0 +1,153 @@
+"""Breadth-first distances from many sources at once.
+
+Up to 64 sources share one bfs: every vertex keeps a 64 bit mask with one
+bit per source, and a whole level is expanded by OR-ing the masks of each
+vertex's neighbours over the CSR adjacency. Batches of 64 sources can be
+spread over a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence, Tuple, List, Optional
+import numpy as np
+
+from csr import CSRGraph, index_dtype
+
+BATCH_SIZE = 64  # Sources per bit mask.
+
+_offsets: Optional[np.ndarray] = None
+_targets: Optional[np.ndarray] = None
+
+
+def _bfs_batch(offsets: np.ndarray, targets: np.ndarray,
+               sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Bit-parallel bfs from at most 64 sources.
+
+    Graph edges are stored in both directions, so the neighbours of v are
+    also the vertices with an edge into v and a level can be pulled with a
+    segmented OR over each vertex's edge slice.
+    """
+    vertex_count: int = len(offsets) - 1
+    degrees: np.ndarray = np.diff(offsets)
+    edge_sources: np.ndarray = np.repeat(np.arange(vertex_count, dtype=targets.dtype), degrees)
+    segment_owners: np.ndarray = np.flatnonzero(degrees)
+    segment_starts: np.ndarray = offsets[segment_owners]
+
+    distances: np.ndarray = np.full((len(sources), vertex_count), -1, dtype=np.int32)
+    predecessors: np.ndarray = np.full((len(sources), vertex_count), -1, dtype=targets.dtype)
+    rows: np.ndarray = np.arange(len(sources))
+    distances[rows, sources] = 0
+
+    frontier: np.ndarray = np.zeros(vertex_count, dtype=np.uint64)
+    np.bitwise_or.at(frontier, sources, np.uint64(1) << rows.astype(np.uint64))
+    visited: np.ndarray = frontier.copy()
+    level: int = 0
+
+    while frontier.any() and len(segment_owners):
+        level += 1
+        reached: np.ndarray = np.zeros(vertex_count, dtype=np.uint64)
+        reached[segment_owners] = np.bitwise_or.reduceat(frontier[targets], segment_starts)
+        previous: np.ndarray = frontier
+        frontier = reached & ~visited
+        visited |= frontier
+
+        # Edges from a newly reached vertex back into the previous level
+        # tell which neighbour is the predecessor for each source bit.
+        hits: np.ndarray = frontier[edge_sources] & previous[targets]
+        active: np.ndarray = np.flatnonzero(hits)
+        hits = hits[active]
+        for row in rows:
+            chosen: np.ndarray = active[(hits >> np.uint64(row)) & np.uint64(1) == 1]
+            # Several edges may supply the same predecessor bit; any one is fine.
+            reached_vertices: np.ndarray = edge_sources[chosen]
+            unseen: np.ndarray = distances[row, reached_vertices] < 0
+            reached_vertices = reached_vertices[unseen]
+            distances[row, reached_vertices] = level
+            predecessors[row, reached_vertices] = targets[chosen[unseen]]
+    return distances, predecessors
+
+
+def _init_worker(offsets: np.ndarray, targets: np.ndarray):
+    global _offsets, _targets
+    _offsets = offsets
+    _targets = targets
+
+
+def _worker_batch(sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return _bfs_batch(_offsets, _targets, sources)
+
+
+def multi_source_bfs(graph: CSRGraph, sources: Sequence[int],
+                     processes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Hop distances and bfs predecessors from every source index.
+
+    Returns two arrays of shape (len(sources), vertex_count): distances
+    with -1 for unreachable vertices, and predecessors with -1 for the
+    sources themselves and unreachable vertices. With processes set the
+    batches of 64 sources run in a process pool.
+    """
+    sources = np.asarray(sources, dtype=graph.targets.dtype)
+    batches: List[np.ndarray] = [sources[i:i + BATCH_SIZE]
+                                 for i in range(0, len(sources), BATCH_SIZE)]
+    if not batches:
+        return (np.empty((0, graph.vertex_count), dtype=np.int32),
+                np.empty((0, graph.vertex_count), dtype=graph.targets.dtype))
+
+    if processes is None or len(batches) == 1:
+        results = [_bfs_batch(graph.offsets, graph.targets, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(graph.offsets, graph.targets)) as pool:
+            results = list(pool.map(_worker_batch, batches))
+
+    return (np.concatenate([distances for distances, _ in results]),
+            np.concatenate([predecessors for _, predecessors in results]))
+
+
+def all_pairs_bfs(graph: CSRGraph, processes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Hop distance and predecessor matrices between every pair of vertices."""
+    return multi_source_bfs(graph, np.arange(graph.vertex_count, dtype=index_dtype(graph.vertex_count)),
+                            processes)
+
+
+def path_from_predecessors(predecessors: np.ndarray, source: int, target: int) -> List[int]:
+    """Follow the predecessor row of source back from target.
+
+    Returns the vertex indices from source to target, or an empty list if
+    target was not reached.
+    """
+    if target != source and predecessors[target] < 0:
+        return []
+    path: List[int] = [target]
+    while predecessors[path[-1]] >= 0:
+        path.append(int(predecessors[path[-1]]))
+    path.reverse()
+    return path
+
+
+if __name__ == "__main__":
+    from graph import Graph
+
+    city_graph: Graph[str] = Graph(["Seattle", "San Francisco", "Los Angeles",
+                                    "Riverside", "Phoenix", "Chicago", "Boston",
+                                    "New York", "Atlanta", "Miami", "Dallas",
+                                    "Houston", "Detroit", "Philadelphia", "Washington"])
+    for first, second in [("Seattle", "Chicago"), ("Seattle", "San Francisco"),
+                          ("San Francisco", "Riverside"), ("San Francisco", "Los Angeles"),
+                          ("Los Angeles", "Riverside"), ("Los Angeles", "Phoenix"),
+                          ("Riverside", "Phoenix"), ("Riverside", "Chicago"),
+                          ("Phoenix", "Dallas"), ("Phoenix", "Houston"),
+                          ("Dallas", "Chicago"), ("Dallas", "Atlanta"),
+                          ("Dallas", "Houston"), ("Houston", "Atlanta"),
+                          ("Houston", "Miami"), ("Atlanta", "Chicago"),
+                          ("Atlanta", "Washington"), ("Atlanta", "Miami"),
+                          ("Miami", "Washington"), ("Chicago", "Detroit"),
+                          ("Detroit", "Boston"), ("Detroit", "Washington"),
+                          ("Detroit", "New York"), ("Boston", "New York"),
+                          ("New York", "Philadelphia"), ("Philadelphia", "Washington")]:
+        city_graph.add_edge_by_vertices(first, second)
+
+    csr_graph: CSRGraph[str] = CSRGraph.from_graph(city_graph)
+    depots: List[int] = [csr_graph.index_of("Boston"), csr_graph.index_of("Dallas")]
+    distance_matrix, predecessor_matrix = multi_source_bfs(csr_graph, depots)
+    print(distance_matrix)
+    path = path_from_predecessors(predecessor_matrix[0], depots[0], csr_graph.index_of("Phoenix"))
+    print([csr_graph.vertex_at(i) for i in path])
@@ -0,0 +1,133 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Dict, Optional, Tuple, Hashable, List
+from graph import V
+from SearchProblems.data_structures import Queue
+from SearchProblems.generic_search import Node
+
+BfsTree = Dict[int, Optional[int]]  # Vertex index -> parent index.
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PathCache(Generic[V]):
+    """Bounded LRU cache of bfs results for one SearchableGraph.
+
+    Entries are weighed by the number of vertices they hold and the least
+    recently used ones are evicted once capacity is exceeded. With
+    cache_trees the whole bfs tree of a start vertex is kept, so any later
+    query from that start only walks the path back from end.
+
+    The graph's version is checked on every lookup and the cache is
+    emptied whenever vertices or edges were added since it was filled.
+    """
+
+    def __init__(self, graph, capacity: int = 1_000_000, cache_trees: bool = False):
+        self._graph = graph
+        self.capacity: int = capacity
+        self.cache_trees: bool = cache_trees
+        self.stats: CacheStats = CacheStats()
+        self._entries: OrderedDict[Hashable, Tuple[object, int]] = OrderedDict()
+        self._size: int = 0
+        self._version: int = graph.version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total weight of the cached entries."""
+        return self._size
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def bfs(self, start: V, end: V) -> Optional[Node[V]]:
+        """Cached equivalent of SearchableGraph.bfs."""
+        if self._graph.version != self._version:
+            self.clear()
+            self._version = self._graph.version
+            self.stats.invalidations += 1
+
+        if self.cache_trees:
+            source: int = self._graph.index_of(start)
+            entry = self._lookup(source)
+            if entry is None:
+                tree: BfsTree = self._bfs_tree(source)
+                self._store(source, tree, len(tree))
+            else:
+                tree = entry[0]
+            return self._path_in_tree(tree, self._graph.index_of(end))
+
+        key: Tuple[V, V] = (start, end)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0]
+        node: Optional[Node[V]] = self._graph.index_search(Queue, start, end)
+        self._store(key, node, self._path_length(node))
+        return node
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[object, int]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Hashable, value: object, weight: int):
+        if weight > self.capacity:
+            return
+        self._entries[key] = (value, weight)
+        self._size += weight
+        while self._size > self.capacity:
+            _, (_, evicted_weight) = self._entries.popitem(last=False)
+            self._size -= evicted_weight
+            self.stats.evictions += 1
+
+    @staticmethod
+    def _path_length(node: Optional[Node[V]]) -> int:
+        length: int = 1
+        while node is not None and node.parent is not None:
+            node = node.parent
+            length += 1
+        return length
+
+    def _bfs_tree(self, source: int) -> BfsTree:
+        """Parent of every vertex reachable from source."""
+        tree: BfsTree = {source: None}
+        frontier: List[int] = [source]
+        while frontier:
+            next_frontier: List[int] = []
+            for u in frontier:
+                for edge in self._graph.edges_for_index(u):
+                    if edge.v not in tree:
+                        tree[edge.v] = u
+                        next_frontier.append(edge.v)
+            frontier = next_frontier
+        return tree
+
+    def _path_in_tree(self, tree: BfsTree, target: int) -> Optional[Node[V]]:
+        if target not in tree:
+            return None
+        indices: List[int] = [target]
+        while tree[indices[-1]] is not None:
+            indices.append(tree[indices[-1]])
+        node: Optional[Node[V]] = None
+        for cost, index in enumerate(reversed(indices)):
+            node = Node(self._graph.vertex_at(index), node, float(cost))
+        return node
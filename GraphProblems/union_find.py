@@ -0,0 +1,61 @@
+from typing import List, Dict
+
+
+class UnionFind:
+    """Disjoint sets over the integers 0..n-1.
+
+    Union by size and path halving keep every operation at amortised
+    inverse-Ackermann time.
+    """
+
+    def __init__(self, size: int = 0):
+        self._parents: List[int] = list(range(size))
+        self._sizes: List[int] = [1] * size
+        self.count: int = size  # Number of disjoint sets.
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def add(self) -> int:
+        """Add a new singleton set and return its element."""
+        self._parents.append(len(self._parents))
+        self._sizes.append(1)
+        self.count += 1
+        return len(self._parents) - 1
+
+    def find(self, x: int) -> int:
+        """Get the representative of the set containing x."""
+        parents: List[int] = self._parents
+        while parents[x] != x:
+            parents[x] = parents[parents[x]]
+            x = parents[x]
+        return x
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the sets of a and b, returns False if they were
+        already the same set."""
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self._sizes[a] < self._sizes[b]:
+            a, b = b, a
+        self._parents[b] = a
+        self._sizes[a] += self._sizes[b]
+        self.count -= 1
+        return True
+
+    def connected(self, a: int, b: int) -> bool:
+        """Check whether a and b are in the same set."""
+        return self.find(a) == self.find(b)
+
+    def set_size(self, x: int) -> int:
+        """Get the size of the set containing x."""
+        return self._sizes[self.find(x)]
+
+    def groups(self) -> List[List[int]]:
+        """Get every set as a list of its elements."""
+        groups: Dict[int, List[int]] = {}
+        for x in range(len(self._parents)):
+            groups.setdefault(self.find(x), []).append(x)
+        return list(groups.values())
@@ -1,8 +1,357 @@
 ﻿from __future__ import annotations
-from typing import TypeVar, Generic, List, Sequence
-from copy import deepcopy
-from functools import partial
-from random import uniform
+from typing import TypeVar, Generic, Iterable, List, Optional, Sequence, Tuple, Union
 from statistics import mean, pstdev
 from dataclasses import dataclass
-from data_point import Datapoint
+import numpy as np
+from data_point import DataPoint
+
+
+def zscores(original: Sequence[float]) -> List[float]:
+    avg: float = mean(original)
+    std: float = pstdev(original)
+    if std == 0:  # Return all zeros if there is no variation.
+        return [0] * len(original)
+    return [(x - avg) / std for x in original]
+
+
+def zscore_columns(data: np.ndarray, in_place: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Every column of data as z-scores, with the means and standard
+    deviations used. Columns without variation become all zeros."""
+    means: np.ndarray = data.mean(axis=0)
+    stds: np.ndarray = data.std(axis=0)
+    stds[stds == 0] = 1
+    if not in_place:
+        return (data - means) / stds, means, stds
+    data -= means
+    data /= stds
+    return data, means, stds
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray, squared_norms: Optional[np.ndarray] = None,
+                      chunk_size: int = 1 << 16) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the nearest centroid to every point and the squared
+    distance to it.
+
+    Distances are computed as |x|^2 - 2 x.c + |c|^2 for a chunk of points
+    at a time, so the bulk of the work is one matrix product per chunk and
+    the distance matrix never holds more than chunk_size rows.
+    """
+    if squared_norms is None:
+        squared_norms = np.einsum('ij,ij->i', data, data)
+    centroid_norms: np.ndarray = np.einsum('ij,ij->i', centroids, centroids)
+    labels: np.ndarray = np.empty(len(data), dtype=np.intp)
+    distances: np.ndarray = np.empty(len(data), dtype=data.dtype)
+    for start in range(0, len(data), chunk_size):
+        chunk: slice = slice(start, start + chunk_size)
+        squared: np.ndarray = data[chunk] @ centroids.T
+        squared *= -2
+        squared += centroid_norms
+        labels[chunk] = squared.argmin(axis=1)
+        distances[chunk] = np.take_along_axis(squared, labels[chunk, None], axis=1)[:, 0] + squared_norms[chunk]
+    np.maximum(distances, 0, out=distances)  # Rounding can leave tiny negatives.
+    return labels, distances
+
+
+def cluster_sums(data: np.ndarray, labels: np.ndarray, k: int,
+                 chunk_size: int = 1 << 16) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum of the points in every cluster and the number of them.
+
+    The sums are a product of the one-hot label matrix of a chunk with the
+    chunk, which runs as a matrix product and beats a bincount per
+    dimension several times over.
+    """
+    sums: np.ndarray = np.zeros((k, data.shape[1]), dtype=np.float64)
+    clusters: np.ndarray = np.arange(k)
+    for start in range(0, len(data), chunk_size):
+        one_hot: np.ndarray = (labels[start:start + chunk_size, None] == clusters).astype(data.dtype)
+        sums += one_hot.T @ data[start:start + chunk_size]
+    return sums, np.bincount(labels, minlength=k)
+
+
+Point = TypeVar('Point', bound=DataPoint)
+
+
+class KMeans(Generic[Point]):
+    """Lloyd's k-means over all points at once.
+
+    The points are held as one contiguous array, z-scored per dimension
+    unless normalize is False, and every iteration assigns them all to
+    their nearest centroid and moves the centroids to the means of their
+    points, until no centroid moves more than tolerance.
+    """
+
+    @dataclass
+    class Cluster:
+        points: List[Point]
+        centroid: DataPoint
+
+    def __init__(self, k: int, points: Union[Sequence[Point], np.ndarray], normalize: bool = True,
+                 tolerance: float = 1e-4, seed: Optional[int] = None, dtype: type = np.float64,
+                 chunk_size: int = 1 << 16):
+        if k < 1:
+            raise ValueError('k must be >= 1')
+        self._points: Optional[Sequence[Point]] = None if isinstance(points, np.ndarray) else points
+        # A private contiguous copy, normalized in place.
+        data: np.ndarray = (np.array(points, dtype=dtype, order='C') if self._points is None
+                            else np.array([point.dimensions for point in points], dtype=dtype))
+        if data.ndim != 2 or len(data) < k:
+            raise ValueError(f'Need at least {k} points of equal dimensions.')
+        self.means: np.ndarray = np.zeros(data.shape[1], dtype=dtype)
+        self.stds: np.ndarray = np.ones(data.shape[1], dtype=dtype)
+        if normalize:
+            data, self.means, self.stds = zscore_columns(data, in_place=True)
+        self.data: np.ndarray = data
+        self.k: int = k
+        self.tolerance: float = tolerance
+        self.chunk_size: int = chunk_size
+        self._random: np.random.Generator = np.random.default_rng(seed)
+        # Start from k distinct points picked at random.
+        self.centroids: np.ndarray = self.data[self._random.choice(len(self.data), k, replace=False)].copy()
+        self.labels: np.ndarray = np.zeros(len(self.data), dtype=np.intp)
+        self.inertia: float = np.inf  # Sum of squared distances to the nearest centroid.
+        self.iterations: int = 0
+
+    def _assign_clusters(self, squared_norms: np.ndarray):
+        self.labels, distances = nearest_centroids(self.data, self.centroids, squared_norms, self.chunk_size)
+        self.inertia = float(distances.sum())
+
+    def _generate_centroids(self) -> float:
+        """Move every centroid to the mean of its points; a centroid that
+        lost all its points stays put. Returns the largest move."""
+        sums, counts = cluster_sums(self.data, self.labels, self.k, self.chunk_size)
+        filled: np.ndarray = counts > 0
+        new_centroids: np.ndarray = self.centroids.copy()
+        new_centroids[filled] = sums[filled] / counts[filled, None]
+        shift: float = float(np.sqrt(((new_centroids - self.centroids) ** 2).sum(axis=1)).max())
+        self.centroids = new_centroids
+        return shift
+
+    def fit(self, max_iterations: int = 100) -> KMeans[Point]:
+        """Iterate until the centroids move less than the tolerance or
+        max_iterations is reached."""
+        squared_norms: np.ndarray = np.einsum('ij,ij->i', self.data, self.data)
+        for iteration in range(max_iterations):
+            self._assign_clusters(squared_norms)
+            self.iterations = iteration + 1
+            if self._generate_centroids() <= self.tolerance:
+                break
+        self._assign_clusters(squared_norms)
+        return self
+
+    def predict(self, points: Union[Sequence[Point], np.ndarray]) -> np.ndarray:
+        """Cluster index of every new point."""
+        data: np.ndarray = (np.asarray(points, dtype=self.data.dtype) if isinstance(points, np.ndarray)
+                            else np.array([point.dimensions for point in points], dtype=self.data.dtype))
+        return nearest_centroids((data - self.means) / self.stds, self.centroids, chunk_size=self.chunk_size)[0]
+
+    @property
+    def cluster_centers(self) -> np.ndarray:
+        """The centroids in the units of the original points."""
+        return self.centroids * self.stds + self.means
+
+    def run(self, max_iterations: int = 100) -> List[KMeans.Cluster]:
+        """Fit and return the clusters with their points and centroids."""
+        self.fit(max_iterations)
+        members: List[List[Point]] = [[] for _ in range(self.k)]
+        points: Sequence = self._points if self._points is not None else [DataPoint(row) for row in
+                                                                         self.data * self.stds + self.means]
+        for point, label in zip(points, self.labels.tolist()):
+            members[label].append(point)
+        return [KMeans.Cluster(cluster_points, DataPoint(centroid.tolist()))
+                for cluster_points, centroid in zip(members, self.cluster_centers)]
+
+
+class MiniBatchKMeans:
+    """k-means on random batches of points, for data larger than memory.
+
+    Every batch is assigned to the nearest centroids and each centroid
+    moves towards the mean of its batch points by its own learning rate,
+    the share of all the points it has been given so far that came in this
+    batch. A centroid therefore settles as it sees more points, and memory
+    stays at a few batches' worth of points however large the data is.
+
+    Points are z-scored with the means and standard deviations given, or
+    estimated from a sample when fitting an array, or else from the first
+    batch_size points given to partial_fit. Those are buffered, as are the
+    first points until there are at least k, and seed the centroids.
+    """
+
+    def __init__(self, k: int, batch_size: int = 4096, normalize: bool = True,
+                 means: Optional[np.ndarray] = None, stds: Optional[np.ndarray] = None,
+                 max_no_improvement: int = 10, seed: Optional[int] = None, dtype: type = np.float64):
+        if k < 1:
+            raise ValueError('k must be >= 1')
+        if (means is None) != (stds is None):
+            raise ValueError('Give both means and stds, or neither.')
+        self.k: int = k
+        self.batch_size: int = batch_size
+        self.normalize: bool = normalize
+        self.means: Optional[np.ndarray] = None if means is None else np.asarray(means, dtype=dtype)
+        self.stds: Optional[np.ndarray] = None if stds is None else np.asarray(stds, dtype=dtype)
+        self.max_no_improvement: int = max_no_improvement
+        self.dtype: type = dtype
+        self._random: np.random.Generator = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self.counts: np.ndarray = np.zeros(k, dtype=np.int64)  # Points each centroid has been given.
+        self.batches: int = 0
+        self.smoothed_inertia: Optional[float] = None  # Moving average of the inertia per point.
+        self._pending: List[np.ndarray] = []  # Points held back until the centroids are seeded.
+        self._pending_points: int = 0
+
+    def _prepare(self, batch: np.ndarray) -> np.ndarray:
+        """A normalized copy of the batch, setting the normalization from it
+        if there is none yet."""
+        data: np.ndarray = np.array(batch, dtype=self.dtype, order='C', ndmin=2)
+        if self.means is None:
+            if self.normalize:
+                _, self.means, self.stds = zscore_columns(data)
+            else:
+                self.means = np.zeros(data.shape[1], dtype=self.dtype)
+                self.stds = np.ones(data.shape[1], dtype=self.dtype)
+        data -= self.means
+        data /= self.stds
+        return data
+
+    def partial_fit(self, batch: np.ndarray) -> MiniBatchKMeans:
+        """Update the centroids with one batch of points.
+
+        Until the centroids are seeded, points are only buffered: k of them
+        at least, and batch_size of them if the normalization comes from
+        them too. They then seed k random centroids and make the first
+        update together.
+        """
+        if self.centroids is not None:
+            return self._update(self._prepare(batch))
+        points: np.ndarray = np.array(batch, dtype=self.dtype, ndmin=2)
+        self._pending.append(points)
+        self._pending_points += len(points)
+        needed: int = self.k if self.means is not None or not self.normalize else max(self.k, self.batch_size)
+        if self._pending_points >= needed:
+            self._seed()
+        return self
+
+    def _seed(self):
+        data: np.ndarray = self._prepare(np.concatenate(self._pending))
+        self._pending, self._pending_points = [], 0
+        self.centroids = data[self._random.choice(len(data), self.k, replace=False)].copy()
+        self._update(data)
+
+    def _update(self, data: np.ndarray) -> MiniBatchKMeans:
+        labels, distances = nearest_centroids(data, self.centroids)
+        sums, batch_counts = cluster_sums(data, labels, self.k)
+        self.counts += batch_counts
+        seen: np.ndarray = batch_counts > 0
+        rates: np.ndarray = batch_counts[seen] / self.counts[seen]
+        batch_means: np.ndarray = sums[seen] / batch_counts[seen, None]
+        self.centroids[seen] += rates[:, None] * (batch_means - self.centroids[seen])
+        inertia: float = float(distances.mean()) if len(distances) else 0.0
+        self.smoothed_inertia = inertia if self.smoothed_inertia is None else \
+            0.9 * self.smoothed_inertia + 0.1 * inertia
+        self.batches += 1
+        return self
+
+    def fit(self, source: Union[np.ndarray, Iterable[np.ndarray]], max_batches: int = 1000) -> MiniBatchKMeans:
+        """Fit on an array, such as a np.memmap, or an iterable of batches.
+
+        From an array, batches are random rows, read in file order, and the
+        normalization comes from a random sample of 10 batches unless it
+        was given. An iterable is consumed in batch_size pieces, and unless
+        the normalization was given it comes from its first batch_size
+        points, or from all of them if there are fewer. Stops after
+        max_batches batches, or once the smoothed inertia has not improved
+        for max_no_improvement batches.
+        """
+        best: float = np.inf
+        stale: int = 0
+        for batch in self._batches(source, max_batches):
+            self.partial_fit(batch)
+            if self.smoothed_inertia is None:
+                continue
+            if self.smoothed_inertia < best:
+                best, stale = self.smoothed_inertia, 0
+            else:
+                stale += 1
+                if stale >= self.max_no_improvement:
+                    break
+        if self.centroids is None:
+            if self._pending_points < self.k:
+                raise ValueError(f'Need at least {self.k} points, got {self._pending_points}.')
+            self._seed()
+        return self
+
+    def _batches(self, source: Union[np.ndarray, Iterable[np.ndarray]], max_batches: int) -> Iterable[np.ndarray]:
+        if isinstance(source, np.ndarray):
+            if self.means is None and self.normalize:
+                sample: np.ndarray = np.asarray(source[np.sort(self._random.choice(
+                    len(source), min(len(source), 10 * self.batch_size), replace=False))], dtype=self.dtype)
+                _, self.means, self.stds = zscore_columns(sample)
+            for _ in range(max_batches):
+                rows: np.ndarray = self._random.choice(len(source), min(len(source), self.batch_size), replace=False)
+                yield source[np.sort(rows)]
+            return
+        # Blocks are cut and joined into pieces of batch_size points.
+        count: int = 0
+        held: List[np.ndarray] = []
+        held_points: int = 0
+        for block in source:
+            block = np.asarray(block)
+            while len(block):
+                take: np.ndarray = block[:self.batch_size - held_points]
+                block = block[len(take):]
+                held.append(take)
+                held_points += len(take)
+                if held_points == self.batch_size:
+                    if count == max_batches:
+                        return
+                    count += 1
+                    yield np.concatenate(held) if len(held) > 1 else held[0]
+                    held, held_points = [], 0
+        if held_points and count < max_batches:
+            yield np.concatenate(held)
+
+    def predict(self, points: np.ndarray) -> np.ndarray:
+        """Cluster index of every point of a batch."""
+        if self.centroids is None:
+            raise ValueError('The model has not been fitted.')
+        return nearest_centroids(self._prepare(points), self.centroids)[0]
+
+    def label(self, data: np.ndarray, out: Optional[np.ndarray] = None, chunk_size: int = 1 << 16) -> np.ndarray:
+        """The final labelling pass: cluster index of every row of data,
+        a chunk at a time, written to out (which may be a np.memmap too)."""
+        if out is None:
+            out = np.empty(len(data), dtype=np.int32)
+        for start in range(0, len(data), chunk_size):
+            out[start:start + chunk_size] = self.predict(data[start:start + chunk_size])
+        return out
+
+    @property
+    def cluster_centers(self) -> np.ndarray:
+        """The centroids in the units of the original points."""
+        return self.centroids * self.stds + self.means
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    point1: DataPoint = DataPoint([2.0, 1.0, 1.0])
+    point2: DataPoint = DataPoint([2.0, 2.0, 5.0])
+    point3: DataPoint = DataPoint([3.0, 1.5, 2.5])
+    kmeans_test: KMeans[DataPoint] = KMeans(2, [point1, point2, point3], seed=0)
+    test_clusters: List[KMeans.Cluster] = kmeans_test.run()
+    for index, cluster in enumerate(test_clusters):
+        print(f"Cluster {index}: {cluster.points}")
+
+    generator: np.random.Generator = np.random.default_rng(0)
+    centers: np.ndarray = generator.normal(0, 10, (8, 50))
+    blobs: np.ndarray = centers[generator.integers(0, 8, 1_000_000)] + generator.normal(0, 1, (1_000_000, 50))
+    began: float = perf_counter()
+    model: KMeans = KMeans(8, blobs, seed=0).fit()
+    print(f'1,000,000 points in 50 dimensions: {model.iterations} iterations in '
+          f'{perf_counter() - began:.1f} seconds, inertia {model.inertia:.0f}')
+
+    minibatch: MiniBatchKMeans = MiniBatchKMeans(8, seed=0)
+    began = perf_counter()
+    minibatch.fit(blobs, max_batches=300)
+    labels: np.ndarray = minibatch.label(blobs)
+    print(f'Mini-batch: {minibatch.batches} batches and a labelling pass in {perf_counter() - began:.1f} seconds, '
+          f'inertia {nearest_centroids((blobs - minibatch.means) / minibatch.stds, minibatch.centroids)[1].sum():.0f}')
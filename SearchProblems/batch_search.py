@@ -0,0 +1,88 @@
+"""Batched lookups of many keys in one sorted sequence.
+
+Kept apart from generic_search so that the search engine and its users
+do not need NumPy.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable, Optional, Sequence, Tuple
+import numpy as np
+from SearchProblems.generic_search import C
+
+
+def _as_key_array(items: Sequence) -> Optional[np.ndarray]:
+    """items as a one dimensional NumPy array of numbers, strings or bytes,
+    or None if they are anything else (tuples, objects, mixed types)."""
+    try:
+        array: np.ndarray = np.asarray(items)
+    except ValueError:
+        return None
+    if array.ndim != 1 or array.dtype.kind not in 'biufUS':
+        return None
+    return array
+
+
+def _key_arrays(sequence: Sequence, keys: Sequence) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Both sides as comparable NumPy arrays, or None if searchsorted
+    cannot be used on them."""
+    sequence_array: Optional[np.ndarray] = _as_key_array(sequence)
+    if sequence_array is None:
+        return None
+    key_array: Optional[np.ndarray] = _as_key_array(keys)
+    if key_array is None:
+        return None
+    numeric: str = 'biuf'
+    if (sequence_array.dtype.kind in numeric) != (key_array.dtype.kind in numeric) and len(sequence_array):
+        return None
+    return sequence_array, key_array
+
+
+def _searchsorted(sequence_array: np.ndarray, key_array: np.ndarray) -> np.ndarray:
+    """np.searchsorted, sorting big batches of keys first: consecutive
+    sorted keys touch neighbouring parts of the sequence, which is several
+    times faster than jumping around it once it no longer fits in cache."""
+    if len(key_array) < 1 << 16 or len(sequence_array) < 1 << 16 or np.all(key_array[1:] >= key_array[:-1]):
+        return np.searchsorted(sequence_array, key_array, side='left')
+    order: np.ndarray = np.argsort(key_array)
+    ranks: np.ndarray = np.empty(len(key_array), dtype=np.intp)
+    ranks[order] = np.searchsorted(sequence_array, key_array[order], side='left')
+    return ranks
+
+
+def batch_rank(sequence: Sequence[C], keys: Sequence[C]) -> np.ndarray:
+    """Index of the first item of the sorted sequence that is not less than
+    each key, like bisect_left for a whole batch of keys at once.
+
+    Numbers, strings and bytes go through np.searchsorted; pass NumPy
+    arrays to skip converting lists on every call. Other comparable keys
+    (tuples, objects) are sorted and merged into the sequence, each bisect
+    starting where the previous key ended.
+    """
+    arrays: Optional[Tuple[np.ndarray, np.ndarray]] = _key_arrays(sequence, keys)
+    if arrays is not None:
+        return _searchsorted(*arrays)
+    ranks: np.ndarray = np.empty(len(keys), dtype=np.int64)
+    if all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1)):
+        order: Iterable[int] = range(len(keys))
+    else:
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+    low: int = 0
+    for index in order:
+        low = bisect_left(sequence, keys[index], low)
+        ranks[index] = low
+    return ranks
+
+
+def batch_contains(sequence: Sequence[C], keys: Sequence[C]) -> np.ndarray:
+    """Boolean array telling which keys are in the sorted sequence."""
+    arrays: Optional[Tuple[np.ndarray, np.ndarray]] = _key_arrays(sequence, keys)
+    if arrays is None:
+        ranks: np.ndarray = batch_rank(sequence, keys)
+        return np.fromiter((rank < len(sequence) and sequence[rank] == key for rank, key in zip(ranks, keys)),
+                           dtype=bool, count=len(keys))
+    sequence_array, key_array = arrays
+    ranks = _searchsorted(sequence_array, key_array)
+    in_range: np.ndarray = ranks < len(sequence_array)
+    found: np.ndarray = np.zeros(len(key_array), dtype=bool)
+    found[in_range] = sequence_array[ranks[in_range]] == key_array[in_range]
+    return found
@@ -1,6 +1,7 @@
 from collections import deque
 from heapq import heappop, heappush
-from typing import TypeVar, Generic, List
+from itertools import count
+from typing import TypeVar, Generic, List, Dict, Optional, Tuple, Iterator
 
 T = TypeVar('T')
 
@@ -20,6 +21,9 @@ class Stack(Generic[T]):
     def pop(self) -> T:
         return self._container.pop()
     
+    def __len__(self) -> int:
+        return len(self._container)
+    
     def __repr__(self):
         return repr(self._container)
 
@@ -40,6 +44,9 @@ class Queue(Generic[T]):
     def pop(self) -> T:
         return self._container.popleft()
     
+    def __len__(self) -> int:
+        return len(self._container)
+    
     def __repr__(self):
         return repr(self._container)
     
@@ -57,7 +64,167 @@ class PriorityQueue(Generic[T]):
     def pop(self) -> T:
         return heappop(self._container)
     
+    def __len__(self) -> int:
+        return len(self._container)
+    
     def __repr__(self):
         return repr(self._container)
+
+
+class KeyedPriorityQueue(Generic[T]):
+    """A binary heap of nodes keyed by (f, -cost, insertion order).
+
+    The key is worked out once on push, so the heap compares plain tuples
+    and never calls Node.__lt__. Ties on f go to the deeper node and then
+    to the older one, so the order is the same as PriorityQueue's apart
+    from its arbitrary choices between fully equal nodes.
+    """
+    
+    def __init__(self):
+        self._container: List[Tuple[float, float, int, T]] = []
+        self._counter: Iterator[int] = count()
+        
+    @property
+    def empty(self) -> bool:
+        return not self._container
+    
+    def push(self, item: T):
+        heappush(self._container, (item.cost + item.heuristic, -item.cost, next(self._counter), item))
+        
+    def pop(self) -> T:
+        return heappop(self._container)[-1]
     
+    def __len__(self) -> int:
+        return len(self._container)
     
+    def __repr__(self):
+        return repr([entry[-1] for entry in sorted(self._container)])
+
+
+def _integer_f(item) -> int:
+    """cost + heuristic of a node, which must be a whole number."""
+    f = item.cost + item.heuristic
+    whole: int = int(f)
+    if whole != f:
+        raise ValueError(f'f = {f} is not a whole number, use a KeyedPriorityQueue for real costs.')
+    return whole
+
+
+class BucketQueue(Generic[T]):
+    """A priority queue for nodes whose cost + heuristic is a whole number.
+
+    Nodes go into a bucket per f value and pop comes from the lowest
+    non-empty bucket, so there are no comparisons between nodes. Push is
+    O(1). Pop walks up one f value at a time from the last lowest one to
+    the next non-empty bucket, so it costs the gap between successive f
+    values, which stays small when f grows steadily, as in A* with a
+    consistent heuristic. Within a bucket the newest node comes first,
+    which like Node.__lt__ favours the deeper nodes among equal f.
+    """
+    
+    def __init__(self):
+        self._buckets: Dict[int, List[T]] = {}
+        self._lowest: int = 0
+        self._size: int = 0
+        
+    @property
+    def empty(self) -> bool:
+        return not self._size
+    
+    def push(self, item: T):
+        f: int = _integer_f(item)
+        bucket: Optional[List[T]] = self._buckets.get(f)
+        if bucket is None:
+            bucket = self._buckets[f] = []
+        bucket.append(item)
+        if self._size == 0 or f < self._lowest:
+            self._lowest = f
+        self._size += 1
+        
+    def pop(self) -> T:
+        if not self._size:
+            raise IndexError('pop from an empty BucketQueue')
+        buckets: Dict[int, List[T]] = self._buckets
+        while self._lowest not in buckets:
+            self._lowest += 1
+        bucket: List[T] = buckets[self._lowest]
+        item: T = bucket.pop()
+        if not bucket:
+            del buckets[self._lowest]  # Only non-empty buckets are kept.
+        self._size -= 1
+        return item
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __repr__(self):
+        return repr({f: list(bucket) for f, bucket in sorted(self._buckets.items())})
+
+
+class DialQueue(Generic[T]):
+    """Dial's bucket queue: a ring of max_spread + 1 buckets.
+
+    Works when f never decreases from one pop to the next and every queued
+    f is at most max_spread above the lowest one. That holds for A* with a
+    consistent heuristic when max_spread is the largest step cost plus the
+    largest change of the heuristic along one step, e.g. 2 on a unit cost
+    grid with manhattan distance, and for Dijkstra with the largest step
+    cost. The ring index is f modulo the ring size, so there is no
+    dictionary lookup at all.
+    """
+    
+    def __init__(self, max_spread: int):
+        if max_spread < 0:
+            raise ValueError('max_spread must not be negative.')
+        self._buckets: List[List[T]] = [[] for _ in range(max_spread + 1)]
+        self._max_spread: int = max_spread
+        self._lowest: int = 0
+        self._size: int = 0
+        
+    @property
+    def empty(self) -> bool:
+        return not self._size
+    
+    def push(self, item: T):
+        f: int = _integer_f(item)
+        if not self._lowest <= f <= self._lowest + self._max_spread:
+            if self._size:
+                raise ValueError(f'f = {f} is outside [{self._lowest}, {self._lowest + self._max_spread}], '
+                                 f'the heuristic is inconsistent or max_spread too small.')
+            self._lowest = f
+        self._buckets[f % len(self._buckets)].append(item)
+        self._size += 1
+        
+    def pop(self) -> T:
+        if not self._size:
+            raise IndexError('pop from an empty DialQueue')
+        buckets: List[List[T]] = self._buckets
+        size: int = len(buckets)
+        while not buckets[self._lowest % size]:
+            self._lowest += 1
+        self._size -= 1
+        return buckets[self._lowest % size].pop()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __repr__(self):
+        size: int = len(self._buckets)
+        return repr({f: list(self._buckets[f % size]) for f in range(self._lowest, self._lowest + size)
+                     if self._buckets[f % size]})
+
+
+def priority_queue_for(cost_model: str = 'real', max_spread: Optional[int] = None):
+    """A new frontier suited to how the search's f values behave.
+
+    'real' costs get a KeyedPriorityQueue. 'integer' costs get a DialQueue
+    when max_spread is known and a BucketQueue otherwise. 'node' keeps the
+    plain PriorityQueue that orders by Node.__lt__.
+    """
+    if cost_model == 'real':
+        return KeyedPriorityQueue()
+    if cost_model == 'integer':
+        return BucketQueue() if max_spread is None else DialQueue(max_spread)
+    if cost_model == 'node':
+        return PriorityQueue()
+    raise ValueError(f"Unknown cost model {cost_model!r}, expected 'real', 'integer' or 'node'.")
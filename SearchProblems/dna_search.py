@@ -1,5 +1,7 @@
 ﻿from enum import IntEnum
-from typing import Tuple, List
+from typing import Tuple, List, Sequence
+import numpy as np
+from SearchProblems.batch_search import batch_contains, batch_rank
 
 # Nucleotide: An organic molecule that is the building block of DNA and RNA.
 Nucleotide = IntEnum('Nucleotide', ('A', 'C', 'G', 'T'))
@@ -25,19 +27,11 @@ def convert_string_to_gene(gene_string: str) -> Gene:
     return gene
 
 
-my_gene = convert_string_to_gene(gene_str)
-
 def linear_search(gene: Gene, key_codon: Codon) -> bool:
     """Linear search to see if key_codon is contained in gene."""
     return any(codon == key_codon for codon in gene)
     
 
-acg: Codon = (Nucleotide.A, Nucleotide.C, Nucleotide.G)
-gat: Codon = (Nucleotide.G, Nucleotide.A, Nucleotide.T)
-print(linear_search(my_gene, acg))  # True
-print(linear_search(my_gene, gat))  # False
-
-
 def binary_search(gene: Gene, key_codon: Codon) -> bool:
     """Binary search of a sorted gene."""
     
@@ -48,13 +42,38 @@ def binary_search(gene: Gene, key_codon: Codon) -> bool:
     while a <= b:
         midpoint: int = (a + b) // 2
         if gene[midpoint] < key_codon:
-            a = b + 1
+            a = midpoint + 1
         elif gene[midpoint] > key_codon:
             b = midpoint -1
         else:
             return True
     return False
 
-my_sorted_gene: Gene = sorted(my_gene)
-print(binary_search(my_sorted_gene, acg))  # True
-print(binary_search(my_sorted_gene, gat))  # False
\ No newline at end of file
+
+
+def encode_codons(codons: Sequence[Codon]) -> np.ndarray:
+    """Each codon as one number from 0 to 63, ordered like the tuples."""
+    values: np.ndarray = np.asarray(codons, dtype=np.int8).reshape(-1, 3) - 1
+    return (values[:, 0] << 4) | (values[:, 1] << 2) | values[:, 2]
+
+
+def batch_search(sorted_gene: Gene, key_codons: Sequence[Codon]) -> np.ndarray:
+    """binary_search for many codons at once, a boolean per key codon."""
+    return batch_contains(encode_codons(sorted_gene), encode_codons(key_codons))
+
+
+def batch_codon_rank(sorted_gene: Gene, key_codons: Sequence[Codon]) -> np.ndarray:
+    """Index of the first codon of the sorted gene not less than each key codon."""
+    return batch_rank(encode_codons(sorted_gene), encode_codons(key_codons))
+
+if __name__ == "__main__":
+    my_gene = convert_string_to_gene(gene_str)
+    acg: Codon = (Nucleotide.A, Nucleotide.C, Nucleotide.G)
+    gat: Codon = (Nucleotide.G, Nucleotide.A, Nucleotide.T)
+    print(linear_search(my_gene, acg))  # True
+    print(linear_search(my_gene, gat))  # False
+
+    my_sorted_gene: Gene = sorted(my_gene)
+    print(binary_search(my_sorted_gene, acg))  # True
+    print(binary_search(my_sorted_gene, gat))  # False
+    print(batch_search(my_sorted_gene, [acg, gat]))  # [ True False]
@@ -1,8 +1,11 @@
 """Copied from page"""
 from __future__ import annotations
-from typing import TypeVar, Iterable, Sequence, Generic, List, Callable, Set, Deque, Dict, Any, Optional
+from typing import TypeVar, Iterable, Sequence, Generic, List, Callable, Set, Deque, Dict, Any, Optional, Tuple
 from typing_extensions import Protocol
 from heapq import heappush, heappop
+from dataclasses import dataclass
+from time import perf_counter
+from SearchProblems.data_structures import Stack, Queue, priority_queue_for
 
 T = TypeVar('T')
 def linear_contains(iterable: Iterable[T], key: T) -> bool:
@@ -43,6 +46,181 @@ def binary_contains(sequence: Sequence[C], key: C) -> bool:
             return True
     return False
 
+class Node(Generic[T]):
+    __slots__ = ('state', 'parent', 'cost', 'heuristic')
+
+    def __init__(self, state: T, parent: Optional[Node], cost: float = 0.0,
+                 heuristic: float = 0.0):
+        self.state = state
+        self.parent = parent
+        self.cost = cost
+        self.heuristic = heuristic
+        
+    def __repr__(self):
+        return f'{self.state}'
+        
+    def __lt__(self, other: Node) -> bool:
+        # Among equal f prefer the deeper node, it is closer to the goal.
+        f: float = self.cost + self.heuristic
+        other_f: float = other.cost + other.heuristic
+        if f == other_f:
+            return self.cost > other.cost
+        return f < other_f
+
+
+class Frontier(Protocol[T]):
+    """Anything search can keep its unexpanded nodes in, like the Stack,
+    Queue, PriorityQueue and BucketQueue of data_structures."""
+
+    @property
+    def empty(self) -> bool:
+        ...
+
+    def push(self, item: T):
+        ...
+
+    def pop(self) -> T:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+GoalTest = Callable[[T], bool]
+Successors = Callable[[T], Iterable[T]]
+Heuristic = Callable[[T], float]
+StepCost = Callable[[T, T], float]
+
+
+@dataclass
+class SearchStats:
+    """What one search did, for profiling and comparing strategies."""
+    nodes_expanded: int = 0
+    nodes_generated: int = 0
+    peak_frontier: int = 0
+    peak_explored: int = 0
+    elapsed: float = 0.0  # Seconds.
+
+
+def search(initial: T, goal_test: GoalTest, successors: Successors, frontier: Frontier[Node[T]],
+           heuristic: Optional[Heuristic] = None,
+           step_cost: Optional[StepCost] = None) -> Tuple[Optional[Node[T]], SearchStats]:
+    """Search from initial until goal_test passes, returns the goal node
+    (or None) and the statistics of the search.
+
+    Without a heuristic or step cost every state is explored once, in the
+    order the frontier hands them out: depth-first with a Stack and
+    breadth-first with a Queue. With either of them the search is A*: it
+    keeps the cheapest known cost of every state, skips frontier entries
+    that were improved on, and needs a frontier ordered by cost plus
+    heuristic, such as a PriorityQueue or BucketQueue.
+    """
+    if heuristic is None and step_cost is None:
+        return _uninformed_search(initial, goal_test, successors, frontier)
+    return _best_first_search(initial, goal_test, successors, frontier,
+                              heuristic or (lambda state: 0.0),
+                              step_cost or (lambda first, second: 1.0))
+
+
+def _uninformed_search(initial: T, goal_test: GoalTest, successors: Successors,
+                       frontier: Frontier[Node[T]]) -> Tuple[Optional[Node[T]], SearchStats]:
+    stats: SearchStats = SearchStats()
+    began: float = perf_counter()
+    frontier.push(Node(initial, None))
+    explored: Set[T] = {initial}
+    peak_frontier: int = 1
+    result: Optional[Node[T]] = None
+
+    while not frontier.empty:
+        current_node: Node[T] = frontier.pop()
+        current_state: T = current_node.state
+        if goal_test(current_state):
+            result = current_node
+            break
+        stats.nodes_expanded += 1
+        for child in successors(current_state):
+            if child in explored:
+                continue
+            explored.add(child)
+            frontier.push(Node(child, current_node, current_node.cost + 1))
+            stats.nodes_generated += 1
+        if len(frontier) > peak_frontier:
+            peak_frontier = len(frontier)
+
+    stats.peak_frontier = peak_frontier
+    stats.peak_explored = len(explored)
+    stats.elapsed = perf_counter() - began
+    return result, stats
+
+
+def _best_first_search(initial: T, goal_test: GoalTest, successors: Successors,
+                       frontier: Frontier[Node[T]], heuristic: Heuristic,
+                       step_cost: StepCost) -> Tuple[Optional[Node[T]], SearchStats]:
+    stats: SearchStats = SearchStats()
+    began: float = perf_counter()
+    frontier.push(Node(initial, None, 0.0, heuristic(initial)))
+    explored: Dict[T, float] = {initial: 0.0}
+    closed: Set[T] = set()
+    peak_frontier: int = 1
+    result: Optional[Node[T]] = None
+
+    while not frontier.empty:
+        current_node: Node[T] = frontier.pop()
+        current_state: T = current_node.state
+        if current_state in closed:
+            continue  # Stale entry, the state was expanded at a lower cost.
+        if goal_test(current_state):
+            result = current_node
+            break
+        closed.add(current_state)
+        stats.nodes_expanded += 1
+        for child in successors(current_state):
+            if child in closed:
+                continue
+            new_cost: float = current_node.cost + step_cost(current_state, child)
+            if child not in explored or explored[child] > new_cost:
+                explored[child] = new_cost
+                frontier.push(Node(child, current_node, new_cost, heuristic(child)))
+                stats.nodes_generated += 1
+        if len(frontier) > peak_frontier:
+            peak_frontier = len(frontier)
+
+    stats.peak_frontier = peak_frontier
+    stats.peak_explored = len(explored)
+    stats.elapsed = perf_counter() - began
+    return result, stats
+
+
+def dfs(initial: T, goal_test: GoalTest, successors: Successors) -> Tuple[Optional[Node[T]], SearchStats]:
+    """Depth-first search."""
+    return search(initial, goal_test, successors, Stack())
+
+
+def bfs(initial: T, goal_test: GoalTest, successors: Successors) -> Tuple[Optional[Node[T]], SearchStats]:
+    """Breadth-first search."""
+    return search(initial, goal_test, successors, Queue())
+
+
+def astar(initial: T, goal_test: GoalTest, successors: Successors, heuristic: Heuristic,
+          step_cost: Optional[StepCost] = None, frontier: Optional[Frontier[Node[T]]] = None,
+          cost_model: str = 'real', max_spread: Optional[int] = None) -> Tuple[Optional[Node[T]], SearchStats]:
+    """A* search. Unless a frontier is given one is picked for the cost
+    model, see data_structures.priority_queue_for."""
+    if frontier is None:
+        frontier = priority_queue_for(cost_model, max_spread)
+    return search(initial, goal_test, successors, frontier, heuristic, step_cost or (lambda first, second: 1.0))
+
+
+def node_to_path(node: Node[T]) -> List[T]:
+    """States from the initial state to the node's state."""
+    path: List[T] = []
+    while node is not None:
+        path.append(node.state)
+        node = node.parent
+    path.reverse()
+    return path
+
+
 if __name__ == "__main__":
     print(linear_contains([1, 5, 15, 15, 15, 15, 20], 5))  # True
     print(binary_contains(["a", "d", "e", "f", "z"], "f"))  # True
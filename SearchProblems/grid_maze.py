@@ -0,0 +1,194 @@
+from __future__ import annotations
+from array import array
+from collections import deque
+from typing import List, Optional, Tuple, Deque
+import numpy as np
+from SearchProblems.generic_search import Node
+from SearchProblems.maze import Maze, MazeCoordinates, Cell
+
+BLOCKED = 0
+OPEN = 1
+
+
+class GridMaze:
+    """Maze stored as one flat bytearray with a byte per cell.
+
+    The grid is surrounded by a border of blocked cells, so the four
+    neighbours of any cell id are id - width, id + width, id - 1 and id + 1
+    and no bounds checks are needed. Searches keep their parents in a flat
+    array indexed by cell id and only create Nodes for the final path.
+    """
+
+    def __init__(self, rows: int = 10, columns: int = 10,
+                 sparseness: float = 0.2,
+                 start: MazeCoordinates = MazeCoordinates(0, 0),
+                 goal: MazeCoordinates = MazeCoordinates(9, 9),
+                 seed: Optional[int] = None):
+        self._rows: int = rows
+        self._columns: int = columns
+        self.width: int = columns + 2
+        self.start: MazeCoordinates = start
+        self.goal: MazeCoordinates = goal
+        self.cells: bytearray = bytearray((rows + 2) * self.width)
+        # Offsets of the up, down, left and right neighbours of a cell id.
+        self.steps: Tuple[int, int, int, int] = (-self.width, self.width, -1, 1)
+
+        self._solved_node: Optional[Node[MazeCoordinates]] = None
+        self.path: Optional[List[MazeCoordinates]] = None
+
+        self._randomly_fill_grid(sparseness, seed)
+        self._fill_start_and_goal()
+
+    @classmethod
+    def from_maze(cls, maze: Maze) -> GridMaze:
+        """Copy the walls, start and goal of a list based Maze."""
+        grid: GridMaze = cls(maze._rows, maze._columns, 0.0, maze.start, maze.goal)
+        for row, cells in enumerate(maze._grid):
+            for column, cell in enumerate(cells):
+                if cell == Cell.BLOCKED:
+                    grid.cells[grid.cell_id(MazeCoordinates(row, column))] = BLOCKED
+        return grid
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> int:
+        return self._columns
+
+    @property
+    def start_id(self) -> int:
+        return self.cell_id(self.start)
+
+    @property
+    def goal_id(self) -> int:
+        return self.cell_id(self.goal)
+
+    def as_array(self) -> np.ndarray:
+        """Writable (rows + 2, columns + 2) uint8 view of the padded cells."""
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self._rows + 2, self.width)
+
+    def _randomly_fill_grid(self, sparseness: float, seed: Optional[int], chunk_rows: int = 1024):
+        """Open every cell with probability 1 - sparseness, a block of rows
+        at a time so the random numbers never need more than one block."""
+        generator: np.random.Generator = np.random.default_rng(seed)
+        grid: np.ndarray = self.as_array()
+        for first in range(0, self._rows, chunk_rows):
+            last: int = min(first + chunk_rows, self._rows)
+            block: np.ndarray = generator.random((last - first, self._columns), dtype=np.float32)
+            grid[first + 1:last + 1, 1:-1] = block >= sparseness
+
+    def _fill_start_and_goal(self):
+        self.cells[self.start_id] = OPEN
+        self.cells[self.goal_id] = OPEN
+
+    def cell_id(self, mc: MazeCoordinates) -> int:
+        """Flat index of the coordinates in the padded grid."""
+        return (mc.row + 1) * self.width + mc.column + 1
+
+    def coordinates(self, cell: int) -> MazeCoordinates:
+        """Coordinates of a flat cell index."""
+        row, column = divmod(cell, self.width)
+        return MazeCoordinates(row - 1, column - 1)
+
+    def is_open(self, mc: MazeCoordinates) -> bool:
+        return self.cells[self.cell_id(mc)] == OPEN
+
+    def goal_test(self, mc: MazeCoordinates) -> bool:
+        return mc == self.goal
+
+    def get_possible_moves(self, mc: MazeCoordinates) -> List[MazeCoordinates]:
+        cell: int = self.cell_id(mc)
+        return [self.coordinates(cell + step) for step in self.steps if self.cells[cell + step]]
+
+    def search(self, depth_first: bool = False) -> Optional[Node[MazeCoordinates]]:
+        """Breadth-first search of the maze, or depth-first if asked."""
+        cells: bytearray = self.cells
+        steps: Tuple[int, int, int, int] = self.steps
+        start: int = self.start_id
+        goal: int = self.goal_id
+        parents: array = array('i', [-1]) * len(cells)
+        parents[start] = start
+        frontier: Deque[int] = deque([start])
+        pop = frontier.pop if depth_first else frontier.popleft
+        push = frontier.append
+
+        while frontier:
+            current: int = pop()
+            if current == goal:
+                self._solved_node = self._node_chain(current, parents)
+                return self._solved_node
+            for step in steps:
+                child: int = current + step
+                if cells[child] and parents[child] < 0:
+                    parents[child] = current
+                    push(child)
+        return None
+
+    def dfs(self) -> Optional[Node[MazeCoordinates]]:
+        """Depth-first search of the maze."""
+        return self.search(depth_first=True)
+
+    def bfs(self) -> Optional[Node[MazeCoordinates]]:
+        """Breadth-first search of the maze."""
+        return self.search()
+
+    def _node_chain(self, cell: int, parents: array, costs: Optional[array] = None) -> Node[MazeCoordinates]:
+        """Build the Node chain from the start to cell out of a parent array."""
+        cells: List[int] = [cell]
+        while parents[cells[-1]] != cells[-1]:
+            cells.append(parents[cells[-1]])
+        node: Optional[Node[MazeCoordinates]] = None
+        for depth, cell in enumerate(reversed(cells)):
+            node = Node(self.coordinates(cell), node, costs[cell] if costs is not None else float(depth))
+        return node
+
+    def retrace_node_path(self, node: Optional[Node[MazeCoordinates]] = None) -> List[MazeCoordinates]:
+        """Trace the node's parents and returns list of all coordinates it
+        took to reach its current state."""
+        if node is None:
+            node = self._solved_node
+        path: List[MazeCoordinates] = []
+        while node is not None:
+            path.append(node.state)
+            node = node.parent
+        path.reverse()
+        self.path = path
+        return path
+
+    def __str__(self):
+        on_path = set(self.path or ())
+        lines: List[str] = []
+        for row in range(self._rows):
+            line: List[str] = []
+            for column in range(self._columns):
+                mc = MazeCoordinates(row, column)
+                if mc == self.start:
+                    line.append(Cell.START.value)
+                elif mc == self.goal:
+                    line.append(Cell.GOAL.value)
+                elif mc in on_path:
+                    line.append(Cell.PATH.value)
+                elif self.is_open(mc):
+                    line.append(Cell.EMPTY.value)
+                else:
+                    line.append(Cell.BLOCKED.value)
+            lines.append(''.join(line))
+        return '\n'.join(lines) + '\n'
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    maze = GridMaze(20, 40, goal=MazeCoordinates(19, 39))
+    maze.bfs()
+    maze.retrace_node_path()
+    print(maze)
+
+    began: float = perf_counter()
+    big_maze = GridMaze(2000, 2000, goal=MazeCoordinates(1999, 1999), seed=1)
+    print(f'Filled a 2000x2000 maze in {perf_counter() - began:.2f} seconds')
+    began = perf_counter()
+    found = big_maze.bfs()
+    print(f'bfs {"found" if found else "did not find"} the goal in {perf_counter() - began:.2f} seconds')
@@ -0,0 +1,201 @@
+"""Preprocessing for many path queries on the same GridMaze.
+
+LandmarkTable stores exact distances from a few landmark cells. By the
+triangle inequality |d(L, goal) - d(L, cell)| never overestimates the
+distance from cell to goal, and the largest of these bounds over all
+landmarks (the ALT heuristic) is usually far tighter than manhattan
+distance.
+
+GoalField stores the exact distance of every cell to one goal, which turns
+any query to that goal into walking downhill one step at a time.
+
+Distances count 4-connected unit moves, like GridMaze.bfs; see
+LandmarkTable.heuristic for searches with diagonal moves. Both tables can
+be saved to and loaded from .npz files.
+"""
+from __future__ import annotations
+from typing import List, Optional
+import numpy as np
+from SearchProblems.grid_maze import GridMaze
+from SearchProblems.grid_astar import CellHeuristic, SQRT2
+from SearchProblems.generic_search import Node
+from SearchProblems.maze import MazeCoordinates
+
+UNREACHED = -1
+
+
+def distance_field(maze: GridMaze, source: int) -> np.ndarray:
+    """Distance of every cell id from source, UNREACHED where there is no path.
+
+    A level-synchronous bfs over the flat grid: each level looks at the
+    four neighbours of the whole frontier at once.
+    """
+    open_cells: np.ndarray = np.frombuffer(maze.cells, dtype=np.uint8) != 0
+    steps: np.ndarray = np.array(maze.steps, dtype=np.int64)
+    distances: np.ndarray = np.full(len(open_cells), UNREACHED, dtype=np.int32)
+    distances[source] = 0
+    frontier: np.ndarray = np.array([source], dtype=np.int64)
+    level: int = 0
+    while len(frontier):
+        level += 1
+        neighbours: np.ndarray = (frontier[:, None] + steps).ravel()
+        neighbours = neighbours[open_cells[neighbours] & (distances[neighbours] == UNREACHED)]
+        frontier = np.unique(neighbours)
+        distances[frontier] = level
+    return distances
+
+
+class LandmarkTable:
+    """Exact distances from landmark cells, used for ALT heuristics."""
+
+    def __init__(self, maze: GridMaze, distances: np.ndarray, landmarks: List[int]):
+        self.maze: GridMaze = maze
+        self.distances: np.ndarray = distances  # Shape (landmarks, cells).
+        self.landmarks: List[int] = landmarks
+        self._rows = [memoryview(row) for row in distances]
+
+    @classmethod
+    def build(cls, maze: GridMaze, count: int = 8, seed: Optional[int] = None) -> LandmarkTable:
+        """Pick count landmarks by farthest-point selection.
+
+        The first landmark is the cell farthest from a random open cell,
+        and each next one is the cell whose nearest landmark is farthest
+        away, which spreads them along the edges of the maze.
+        """
+        generator: np.random.Generator = np.random.default_rng(seed)
+        open_ids: np.ndarray = np.flatnonzero(np.frombuffer(maze.cells, dtype=np.uint8))
+        if not len(open_ids):
+            raise ValueError('The maze has no open cells.')
+        seed_distances: np.ndarray = distance_field(maze, int(generator.choice(open_ids)))
+
+        landmarks: List[int] = []
+        fields: List[np.ndarray] = []
+        nearest: np.ndarray = seed_distances.astype(np.int64)
+        for _ in range(count):
+            landmark: int = int(np.argmax(nearest))
+            if nearest[landmark] <= 0 and landmarks:
+                break  # Every reachable cell already is a landmark.
+            landmarks.append(landmark)
+            fields.append(distance_field(maze, landmark))
+            reached: np.ndarray = fields[-1] != UNREACHED
+            nearest = np.where(reached, np.minimum(nearest, fields[-1]), nearest)
+        return cls(maze, np.stack(fields), landmarks)
+
+    def heuristic(self, goal: MazeCoordinates, diagonal: bool = False) -> CellHeuristic:
+        """ALT lower bound on the distance from a cell id to goal.
+
+        The table's distances count 4-connected moves, so the bound is only
+        admissible for a search with the same moves. For a search with
+        diagonal moves pass diagonal=True: a diagonal step then stands for
+        at most two 4-connected ones, so the bound is divided by sqrt(2),
+        and octile distance takes the place of manhattan distance. The
+        returned function records the moves it was made for in its
+        diagonal attribute, and GridAStar refuses a 4-connected one for a
+        diagonal search.
+
+        Manhattan (or octile) distance is also a lower bound and is tighter
+        near the goal, so the larger of the two is used.
+        """
+        goal_cell: int = self.maze.cell_id(goal)
+        width: int = self.maze.width
+        goal_row, goal_column = divmod(goal_cell, width)
+        pairs = [(row, row[goal_cell]) for row in self._rows if row[goal_cell] != UNREACHED]
+
+        def alt(cell: int) -> float:
+            row_index, column = divmod(cell, width)
+            best: int = abs(row_index - goal_row) + abs(column - goal_column)
+            for row, to_goal in pairs:
+                from_cell: int = row[cell]
+                if from_cell != UNREACHED:
+                    bound: int = abs(to_goal - from_cell)
+                    if bound > best:
+                        best = bound
+            return best
+
+        def diagonal_alt(cell: int) -> float:
+            row_index, column = divmod(cell, width)
+            x: int = abs(column - goal_column)
+            y: int = abs(row_index - goal_row)
+            octile: float = (x + y) + (SQRT2 - 2) * min(x, y)
+            best: int = 0
+            for row, to_goal in pairs:
+                from_cell: int = row[cell]
+                if from_cell != UNREACHED:
+                    bound: int = abs(to_goal - from_cell)
+                    if bound > best:
+                        best = bound
+            return max(octile, best / SQRT2)
+
+        heuristic: CellHeuristic = diagonal_alt if diagonal else alt
+        heuristic.diagonal = diagonal
+        return heuristic
+
+    def save(self, path: str):
+        np.savez(path, distances=self.distances, landmarks=np.array(self.landmarks),
+                 shape=np.array([self.maze.rows, self.maze.columns]))
+
+    @classmethod
+    def load(cls, path: str, maze: GridMaze) -> LandmarkTable:
+        """Load a table saved for the same maze."""
+        with np.load(path) as data:
+            if tuple(data['shape']) != (maze.rows, maze.columns):
+                raise ValueError(f'{path} was built for a {tuple(data["shape"])} maze.')
+            return cls(maze, data['distances'], [int(cell) for cell in data['landmarks']])
+
+
+class GoalField:
+    """Exact distance of every cell to one fixed goal."""
+
+    def __init__(self, maze: GridMaze, goal: MazeCoordinates, distances: Optional[np.ndarray] = None):
+        self.maze: GridMaze = maze
+        self.goal: MazeCoordinates = goal
+        self.distances: np.ndarray = (distances if distances is not None
+                                      else distance_field(maze, maze.cell_id(goal)))
+        self._distances = memoryview(self.distances)
+
+    def distance(self, start: MazeCoordinates) -> Optional[int]:
+        """Moves needed from start to the goal, None if unreachable."""
+        distance: int = self._distances[self.maze.cell_id(start)]
+        return None if distance == UNREACHED else distance
+
+    def path_from(self, start: MazeCoordinates) -> Optional[Node[MazeCoordinates]]:
+        """Shortest path from start to the goal by always stepping to a
+        neighbour one move closer. Takes time proportional to the path."""
+        cell: int = self.maze.cell_id(start)
+        distances = self._distances
+        if distances[cell] == UNREACHED:
+            return None
+        node: Node[MazeCoordinates] = Node(start, None, 0.0)
+        while distances[cell]:
+            for step in self.maze.steps:
+                if distances[cell + step] == distances[cell] - 1:
+                    cell += step
+                    break
+            node = Node(self.maze.coordinates(cell), node, node.cost + 1)
+        return node
+
+    def save(self, path: str):
+        np.savez(path, distances=self.distances, goal=np.array(self.goal),
+                 shape=np.array([self.maze.rows, self.maze.columns]))
+
+    @classmethod
+    def load(cls, path: str, maze: GridMaze) -> GoalField:
+        """Load a field saved for the same maze."""
+        with np.load(path) as data:
+            if tuple(data['shape']) != (maze.rows, maze.columns):
+                raise ValueError(f'{path} was built for a {tuple(data["shape"])} maze.')
+            return cls(maze, MazeCoordinates(*(int(x) for x in data['goal'])), data['distances'])
+
+
+if __name__ == "__main__":
+    from SearchProblems.grid_astar import GridAStar
+
+    maze = GridMaze(300, 300, sparseness=0.25, goal=MazeCoordinates(299, 299), seed=1)
+    table = LandmarkTable.build(maze, count=8, seed=3)
+    for name, heuristic in [('manhattan', None), ('ALT', table.heuristic(maze.goal))]:
+        engine = GridAStar(maze, heuristic)
+        result = engine.search()
+        print(f'{name}: cost {result.cost if result else None}, {engine.expanded} cells expanded')
+
+    field = GoalField(maze, maze.goal)
+    print(f'Distance field: {field.distance(maze.start)} moves to the goal')
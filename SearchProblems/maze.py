@@ -3,8 +3,8 @@ from enum import Enum
 from typing import List, NamedTuple, Callable, Optional, Generic, TypeVar, Set, Union, Dict
 import random
 from math import sqrt
-from SearchProblems.data_structures import Stack, Queue, PriorityQueue
-#from generic_search import dfs, bfs, node_to_path, astar, Node
+from SearchProblems.data_structures import Stack, Queue, priority_queue_for
+from SearchProblems.generic_search import Node, SearchStats, Frontier, Heuristic, StepCost, search
 
 
 T = TypeVar('T')
@@ -25,6 +25,25 @@ def distance(goal: MazeCoordinates) -> Callable[[MazeCoordinates], float]:
         y: int = abs(mc.row - goal.row)
         return x + y
     return distance
+
+
+def octile_distance(goal: MazeCoordinates) -> Callable[[MazeCoordinates], float]:
+    """Returns a function that returns the octile distance from the goal,
+    the exact distance on an open grid with diagonal moves costing sqrt(2)."""
+    def distance(mc: MazeCoordinates) -> float:
+        x: int = abs(mc.column - goal.column)
+        y: int = abs(mc.row - goal.row)
+        return max(x, y) + (sqrt(2) - 1) * min(x, y)
+    return distance
+
+
+def euclidean_distance(goal: MazeCoordinates) -> Callable[[MazeCoordinates], float]:
+    """Returns a function that returns the straight line distance from the goal."""
+    def distance(mc: MazeCoordinates) -> float:
+        x: int = mc.column - goal.column
+        y: int = mc.row - goal.row
+        return sqrt(x * x + y * y)
+    return distance
         
 
 class MazeCoordinates(NamedTuple):
@@ -32,21 +51,6 @@ class MazeCoordinates(NamedTuple):
     column: int
     
 
-class Node(Generic[T]):
-    def __init__(self, state: T, parent: Optional[Node], cost: float = 0.0,
-                 heuristic: float = 0.0):
-        self.state = state
-        self.parent = parent
-        self.cost = cost
-        self.heuristic = heuristic
-        
-    def __repr__(self):
-        return f'{self.state}'
-        
-    def __lt__(self, other: Node) -> bool:
-        return (self.cost + self.heuristic) < (other.cost + other.heuristic)
-
-
 class Maze:
     def __init__(self, rows: int = 10, columns: int = 10,
                  sparseness: float = 0.2,
@@ -62,6 +66,7 @@ class Maze:
         
         self._solved_node = None
         self.path = None
+        self.stats: Optional[SearchStats] = None
         
         self._randomly_fill_grid(rows, columns, sparseness)
         self._fill_start_and_goal(start, goal)
@@ -99,31 +104,7 @@ class Maze:
     
     def search(self, collection_type: Union[Stack, Queue]) -> Node or None:
         """Performs search using given collection type as frontier."""
-        frontier = collection_type()
-        n = Node(self.start, None)
-        print(n)
-        frontier.push(n)
-        print(frontier)
-        explored: Set[T] = {self.start}
-        
-        while not frontier.empty:
-            current_node: Node[T] = frontier.pop()
-            current_state: T = current_node.state
-            
-            # End search if goal is reached
-            if self.goal_test(current_state):
-                self._solved_node = current_node
-                return current_node
-            
-            for child in self.get_possible_moves(current_state):
-                if child in explored:
-                    continue
-                
-                explored.add(child)
-                
-                # Add possible moves not explored to our frontier.
-                frontier.push(Node(child, current_node))
-        # Failed.
+        return self._run(collection_type())
         
     def dfs(self) -> Node or None:
         """Depth-first search of the maze."""
@@ -135,28 +116,19 @@ class Maze:
     
     def astar_search(self) -> Node or None:
         """A* search of the maze."""
-        frontier: PriorityQueue[Node[T]] = PriorityQueue()
-        heuristic = distance(self.goal)
-        n = Node(self.start, None, 0.0, heuristic(self.start))
-        frontier.push(n)
-        explored: Dict[T, float] = {self.start: 0.0}
-        
-        while not frontier.empty:
-            current_node: Node[T] = frontier.pop()
-            current_state: T = current_node.state
-            
-            # End search if goal is reached
-            if self.goal_test(current_state):
-                self._solved_node = current_node
-                return current_node
-            
-            for child in self.get_possible_moves(current_state):
-                new_cost: float = current_node.cost + 1
-                if child not in explored or explored[child] > new_cost:
-                    explored[child] = new_cost
-                    frontier.push(Node(child, current_node, new_cost, heuristic(self.goal)))
-                # Add possible moves not explored to our frontier.
-        # Failed.
+        # Unit steps and manhattan distance keep every f a whole number
+        # within 2 of the lowest queued one.
+        return self._run(priority_queue_for('integer', max_spread=2), distance(self.goal),
+                         lambda first, second: 1.0)
+    
+    def _run(self, frontier: Frontier[Node[MazeCoordinates]], heuristic: Optional[Heuristic] = None,
+             step_cost: Optional[StepCost] = None) -> Node or None:
+        """Runs the generic search and keeps its result and statistics."""
+        node, self.stats = search(self.start, self.goal_test, self.get_possible_moves,
+                                  frontier, heuristic, step_cost)
+        if node is not None:
+            self._solved_node = node
+        return node
     
     def retrace_node_path(self, node: Optional[Node[T]] = None) -> List[T]:
         """Trace the node's parents and returns  list of all nodes it took
@@ -0,0 +1,304 @@
+"""Memory-bounded heuristic searches for huge implicit state spaces.
+
+Both searches take the same pieces as Maze: an initial state, a goal test,
+a successors function and a heuristic, plus an optional step cost (every
+move costs 1 by default). They return the goal's Node, so the path can be
+read back with retrace_node_path, or None if there is no solution.
+
+ida_star keeps only the current path in memory and repeats depth-first
+searches with a growing f limit. A TranspositionTable of bounded size
+stops it from re-searching states it already reached more cheaply in the
+same pass.
+
+sma_star is a simplified memory-bounded A*. It keeps at most max_nodes
+nodes; when memory runs out it forgets the worst leaf and remembers that
+leaf's f in its parent, so the subtree is only regenerated once everything
+else looks worse. A state is not added again while memory already holds
+it at no higher cost. It finds an optimal solution whenever the optimal
+path fits in max_nodes nodes.
+"""
+from __future__ import annotations
+from heapq import heappush, heappop
+from itertools import count
+from math import inf
+from typing import TypeVar, Generic, Callable, Iterable, Optional, Dict, List, Set, Tuple, Iterator
+from SearchProblems.generic_search import Node
+
+T = TypeVar('T')
+
+StepCost = Callable[[T, T], float]
+
+
+def unit_cost(first: T, second: T) -> float:
+    return 1.0
+
+
+class TranspositionTable(Generic[T]):
+    """Bounded map from state to the cheapest cost it was reached with
+    during the current IDA* iteration.
+
+    When full, the least recently stored entry is replaced. Entries from
+    earlier iterations are ignored, since a larger f limit may find more
+    below a state than the previous pass did.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000):
+        self.max_entries: int = max_entries
+        self._entries: Dict[T, Tuple[int, float]] = {}
+        self._iteration: int = 0
+        self.hits: int = 0
+        self.replacements: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def new_iteration(self):
+        self._iteration += 1
+
+    def reached_cheaper(self, state: T, cost: float) -> bool:
+        """Check whether state was already searched at no more than cost
+        in this iteration."""
+        entry: Optional[Tuple[int, float]] = self._entries.get(state)
+        if entry is not None and entry[0] == self._iteration and entry[1] <= cost:
+            self.hits += 1
+            return True
+        return False
+
+    def store(self, state: T, cost: float):
+        if self._entries.pop(state, None) is None and len(self._entries) >= self.max_entries:
+            if not self.max_entries:
+                return
+            del self._entries[next(iter(self._entries))]
+            self.replacements += 1
+        self._entries[state] = (self._iteration, cost)
+
+
+def ida_star(initial: T, goal_test: Callable[[T], bool], successors: Callable[[T], Iterable[T]],
+             heuristic: Callable[[T], float], step_cost: StepCost = unit_cost,
+             table: Optional[TranspositionTable[T]] = None) -> Optional[Node[T]]:
+    """Iterative deepening A*. Uses memory proportional to the solution
+    depth plus the transposition table."""
+    if table is None:
+        table = TranspositionTable()
+    root: Node[T] = Node(initial, None, 0.0, heuristic(initial))
+    if goal_test(initial):
+        return root
+    threshold: float = root.heuristic
+
+    while True:
+        table.new_iteration()
+        table.store(initial, 0.0)
+        next_threshold: float = inf
+        on_path: Set[T] = {initial}
+        stack: List[Tuple[Node[T], Iterator[T]]] = [(root, iter(successors(initial)))]
+
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in on_path:
+                    continue
+                cost: float = node.cost + step_cost(node.state, child)
+                estimate: float = heuristic(child)
+                if cost + estimate > threshold:
+                    next_threshold = min(next_threshold, cost + estimate)
+                    continue
+                if table.reached_cheaper(child, cost):
+                    continue
+                table.store(child, cost)
+                child_node: Node[T] = Node(child, node, cost, estimate)
+                if goal_test(child):
+                    return child_node
+                on_path.add(child)
+                stack.append((child_node, iter(successors(child))))
+                break
+            else:
+                stack.pop()
+                on_path.discard(node.state)
+
+        if next_threshold == inf:
+            return None
+        threshold = next_threshold
+
+
+class _MemoryNode(Generic[T]):
+    """Search tree node of sma_star."""
+    __slots__ = ('state', 'parent', 'cost', 'f', 'depth', 'children', 'forgotten', 'stamp', 'alive')
+
+    def __init__(self, state: T, parent: Optional[_MemoryNode[T]], cost: float, f: float, depth: int):
+        self.state = state
+        self.parent = parent
+        self.cost = cost
+        self.f = f
+        self.depth = depth
+        self.children: List[_MemoryNode[T]] = []
+        self.forgotten: Dict[T, float] = {}  # Pruned children and their backed up f.
+        self.stamp: int = 0  # Bumped whenever older heap entries become stale.
+        self.alive: bool = True
+
+
+class _SMAStar(Generic[T]):
+    def __init__(self, goal_test: Callable[[T], bool], successors: Callable[[T], Iterable[T]],
+                 heuristic: Callable[[T], float], step_cost: StepCost, max_nodes: int):
+        self.goal_test = goal_test
+        self.successors = successors
+        self.heuristic = heuristic
+        self.step_cost = step_cost
+        self.max_nodes: int = max_nodes
+        self.node_count: int = 0
+        # Expandable nodes by (f, deepest first) and prunable leaves by
+        # (highest f, shallowest first).
+        self._open: List[Tuple[float, int, int, int, _MemoryNode[T]]] = []
+        self._leaves: List[Tuple[float, int, int, int, _MemoryNode[T]]] = []
+        self._order: Iterator[int] = count()
+        # Cheapest node in memory for each state, to skip dominated duplicates.
+        self._cheapest: Dict[T, _MemoryNode[T]] = {}
+
+    def _refresh(self, node: _MemoryNode[T]):
+        """Queue node again after its f, children or forgotten changed."""
+        node.stamp += 1
+        if not node.children:
+            heappush(self._open, (node.f, -node.depth, next(self._order), node.stamp, node))
+            if node.parent is not None:
+                heappush(self._leaves, (-node.f, node.depth, next(self._order), node.stamp, node))
+        elif node.forgotten:
+            heappush(self._open, (min(node.forgotten.values()), -node.depth,
+                                  next(self._order), node.stamp, node))
+
+    def _pop_open(self) -> Optional[Tuple[float, _MemoryNode[T]]]:
+        while self._open:
+            key, _, _, stamp, node = heappop(self._open)
+            if node.alive and stamp == node.stamp:
+                return key, node
+        return None
+
+    def _prune_worst_leaf(self, keep: _MemoryNode[T]) -> bool:
+        """Forget the worst leaf other than keep, returns False if there is none."""
+        kept = None
+        try:
+            while self._leaves:
+                entry = heappop(self._leaves)
+                leaf: _MemoryNode[T] = entry[-1]
+                if not leaf.alive or entry[3] != leaf.stamp or leaf.children:
+                    continue
+                if leaf is keep:
+                    kept = entry  # It is about to be expanded.
+                    continue
+                leaf.alive = False
+                if self._cheapest.get(leaf.state) is leaf:
+                    del self._cheapest[leaf.state]
+                parent: _MemoryNode[T] = leaf.parent
+                parent.children.remove(leaf)
+                parent.forgotten[leaf.state] = leaf.f
+                self.node_count -= 1
+                self._refresh(parent)
+                return True
+            return False
+        finally:
+            if kept is not None:
+                heappush(self._leaves, kept)
+
+    def _back_up(self, node: Optional[_MemoryNode[T]]):
+        """Raise f values up the tree to the best f below each node."""
+        while node is not None:
+            values: List[float] = [child.f for child in node.children] + list(node.forgotten.values())
+            if not values:
+                return
+            best: float = max(node.f, min(values))
+            if best == node.f:
+                return
+            node.f = best
+            self._refresh(node)
+            node = node.parent
+
+    def search(self, initial: T) -> Optional[Node[T]]:
+        root: _MemoryNode[T] = _MemoryNode(initial, None, 0.0, self.heuristic(initial), 0)
+        self.node_count = 1
+        self._cheapest[initial] = root
+        self._refresh(root)
+
+        while True:
+            popped = self._pop_open()
+            if popped is None or popped[0] == inf:
+                return None
+            _, node = popped
+            if not node.children and self.goal_test(node.state):
+                return self._node_chain(node)
+            self._expand(node)
+
+    def _expand(self, node: _MemoryNode[T]):
+        in_memory: Set[T] = {child.state for child in node.children}
+        ancestors: Set[T] = set()
+        ancestor: Optional[_MemoryNode[T]] = node
+        while ancestor is not None:
+            ancestors.add(ancestor.state)
+            ancestor = ancestor.parent
+
+        forgotten: Dict[T, float] = node.forgotten
+        node.forgotten = {}
+        new_children: List[_MemoryNode[T]] = []
+        for state in self.successors(node.state):
+            if state in in_memory or state in ancestors:
+                continue
+            cost: float = node.cost + self.step_cost(node.state, state)
+            cheapest: Optional[_MemoryNode[T]] = self._cheapest.get(state)
+            if cheapest is not None and cheapest.cost <= cost:
+                continue  # Whatever lies below is reached more cheaply elsewhere.
+            f: float = max(node.f, cost + self.heuristic(state), forgotten.get(state, -inf))
+            child: _MemoryNode[T] = _MemoryNode(state, node, cost, f, node.depth + 1)
+            # A non-goal child at the deepest level that fits can never lead anywhere.
+            if child.depth >= self.max_nodes - 1 and not self.goal_test(state):
+                node.forgotten[state] = inf
+            else:
+                new_children.append(child)
+
+        new_children.sort(key=lambda child: child.f)
+        while self.node_count + len(new_children) > self.max_nodes and self._prune_worst_leaf(node):
+            pass
+        room: int = max(self.max_nodes - self.node_count, 0)
+        for child in new_children[room:]:
+            node.forgotten[child.state] = child.f
+        for child in new_children[:room]:
+            node.children.append(child)
+            self._cheapest[child.state] = child
+            self._refresh(child)
+        self.node_count += min(room, len(new_children))
+
+        if not node.children and not node.forgotten:
+            node.f = inf  # Dead end.
+            self._refresh(node)
+            self._back_up(node.parent)
+            return
+        self._refresh(node)
+        self._back_up(node)
+
+    @staticmethod
+    def _node_chain(memory_node: _MemoryNode[T]) -> Node[T]:
+        path: List[_MemoryNode[T]] = []
+        while memory_node is not None:
+            path.append(memory_node)
+            memory_node = memory_node.parent
+        node: Optional[Node[T]] = None
+        for memory_node in reversed(path):
+            node = Node(memory_node.state, node, memory_node.cost, memory_node.f - memory_node.cost)
+        return node
+
+
+def sma_star(initial: T, goal_test: Callable[[T], bool], successors: Callable[[T], Iterable[T]],
+             heuristic: Callable[[T], float], max_nodes: int,
+             step_cost: StepCost = unit_cost) -> Optional[Node[T]]:
+    """Simplified memory-bounded A* keeping at most max_nodes nodes."""
+    if max_nodes < 1:
+        raise ValueError('max_nodes must be at least 1.')
+    return _SMAStar(goal_test, successors, heuristic, step_cost, max_nodes).search(initial)
+
+
+if __name__ == "__main__":
+    from SearchProblems.maze import Maze, MazeCoordinates, distance
+
+    maze = Maze(start=MazeCoordinates(2, 2))
+    print(maze)
+    for name, solution in [('IDA*', ida_star(maze.start, maze.goal_test, maze.get_possible_moves,
+                                             distance(maze.goal), table=TranspositionTable(50))),
+                           ('SMA*', sma_star(maze.start, maze.goal_test, maze.get_possible_moves,
+                                             distance(maze.goal), max_nodes=40))]:
+        print(f'{name}: {maze.retrace_node_path(solution) if solution else "no solution"}')
@@ -0,0 +1,255 @@
+"""Scan sequence files for many codons or motifs at once.
+
+The file is memory-mapped and cut into chunks that a process pool scans in
+parallel. Each chunk reads a little past its end, so a match that starts
+inside the chunk but crosses its border is still found, and only matches
+starting inside the chunk are reported, so none is reported twice.
+
+Within a chunk the bases are turned into the 2-bit codes of packed_genome
+and every window is turned into one integer, once per distinct motif
+length. Short motifs are then found by indexing a table of all 4^k codes,
+longer ones by binary search over the sorted motif codes, so the cost per
+base does not grow with the number of motifs.
+
+The file holds bases as text, plain or FASTA. Line breaks are skipped,
+so motifs are found across them however many there are, and so are FASTA
+header lines, those starting with '>'. Any other non-ACGT byte, N
+included, breaks a match. The read past a chunk's end goes on until it
+has the bases the longest motif needs, whatever separators lie between.
+Positions are byte offsets into the file of the motif's first base.
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import mmap
+import os
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from SearchProblems.packed_genome import encode, kmer_codes, KmerIndex
+
+_LINE_BREAKS = np.array([ord('\n'), ord('\r')], dtype=np.uint8)
+_HEADER = ord('>')
+
+Chunk = Tuple[int, int]  # First byte and end of the bytes whose matches the chunk reports.
+
+
+class _ChunkScanner:
+    """Matches the motifs in one chunk of a memory-mapped file."""
+
+    def __init__(self, path: str, motifs: Sequence[str], headers: Tuple[np.ndarray, np.ndarray]):
+        self._file = open(path, 'rb')
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._size: int = len(self._map)
+        self._headers: Tuple[np.ndarray, np.ndarray] = headers
+        self._bases_after: int = max(len(motif) for motif in motifs) - 1
+        self._tables: List[Tuple[int, np.ndarray, np.ndarray]] = []
+        lengths: Dict[int, Dict[int, int]] = {}
+        for number, motif in enumerate(motifs):
+            codes: np.ndarray = encode(motif)
+            code: int = 0
+            for value in codes:
+                code = (code << 2) | int(value)
+            lengths.setdefault(len(motif), {}).setdefault(code, number)
+
+        for length, numbers in sorted(lengths.items()):
+            keys: np.ndarray = np.array(sorted(numbers), dtype=np.int64)
+            values: np.ndarray = np.array([numbers[key] for key in keys], dtype=np.int32)
+            if length <= KmerIndex.DIRECT_K:
+                # Direct table: motif number + 1 for every code, 0 for no motif.
+                table: np.ndarray = np.zeros(4 ** length, dtype=np.int32)
+                table[keys] = values + 1
+                self._tables.append((length, table, np.zeros(0, dtype=np.int32)))
+            else:
+                self._tables.append((length, keys, values))
+
+    def __call__(self, chunk: Chunk) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted positions of the matches starting in the chunk and the
+        number of the motif found at each."""
+        first, owned_end = chunk
+        read_end: int = min(owned_end + 2 * self._bases_after + 64, self._size)
+        while True:
+            raw: np.ndarray = np.frombuffer(self._map, dtype=np.uint8, count=read_end - first, offset=first)
+            kept: Optional[np.ndarray] = self._sequence_mask(first, raw)
+            after: int = (read_end - owned_end if kept is None
+                          else int(np.count_nonzero(kept[owned_end - first:])))
+            if after >= self._bases_after or read_end == self._size:
+                break
+            read_end = min(owned_end + 2 * (read_end - owned_end), self._size)
+        codes: np.ndarray = encode(raw)
+        offsets: Optional[np.ndarray] = None
+        if kept is not None:
+            offsets = np.flatnonzero(kept) + first
+            codes = codes[kept]
+
+        found_positions: List[np.ndarray] = []
+        found_motifs: List[np.ndarray] = []
+        for length, keys, values in self._tables:
+            kmers, starts = kmer_codes(codes, length)
+            positions: np.ndarray = offsets[starts] if offsets is not None else starts + first
+            owned: int = int(np.searchsorted(positions, owned_end))
+            kmers, positions = kmers[:owned], positions[:owned]
+            if not len(values):
+                numbers: np.ndarray = keys[kmers] - 1
+                hits: np.ndarray = numbers >= 0
+            else:
+                slots: np.ndarray = np.minimum(np.searchsorted(keys, kmers), len(keys) - 1)
+                hits = keys[slots] == kmers
+                numbers = values[slots]
+            found_positions.append(positions[hits])
+            found_motifs.append(numbers[hits])
+
+        if len(found_positions) == 1:
+            return found_positions[0], found_motifs[0]
+        positions = np.concatenate(found_positions)
+        motif_numbers: np.ndarray = np.concatenate(found_motifs)
+        order: np.ndarray = np.argsort(positions, kind='stable')
+        return positions[order], motif_numbers[order]
+
+    def _sequence_mask(self, first: int, raw: np.ndarray) -> Optional[np.ndarray]:
+        """Which bytes of raw, read from first on, are sequence rather than
+        line breaks or header lines; None if all of them are."""
+        line_breaks: np.ndarray = np.isin(raw, _LINE_BREAKS)
+        header_starts, header_ends = self._headers
+        # Header lines overlapping raw: they end after first and start before its end.
+        low: int = int(np.searchsorted(header_ends, first, side='right'))
+        high: int = int(np.searchsorted(header_starts, first + len(raw)))
+        if not line_breaks.any() and low == high:
+            return None
+        kept: np.ndarray = ~line_breaks
+        if low < high:
+            # +1 where a header begins and -1 where it ends, summed up.
+            depth: np.ndarray = np.zeros(len(raw) + 1, dtype=np.int8)
+            depth[np.maximum(header_starts[low:high] - first, 0)] += 1
+            depth[np.minimum(header_ends[low:high] - first, len(raw))] -= 1
+            kept &= np.cumsum(depth[:-1], dtype=np.int8) == 0
+        return kept
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _header_lines(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """First byte and end of every FASTA header line, the end being its
+    newline or the end of the file. One pass over the file."""
+    starts: List[int] = []
+    ends: List[int] = []
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[0] == _HEADER:
+            starts.append(0)
+        line_break: int = mapped.find(b'\n>')
+        while line_break >= 0:
+            starts.append(line_break + 1)
+            line_break = mapped.find(b'\n>', line_break + 1)
+        for start in starts:
+            end: int = mapped.find(b'\n', start)
+            ends.append(end if end >= 0 else len(mapped))
+    return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+
+_scanner: Optional[_ChunkScanner] = None
+
+
+def _init_worker(path: str, motifs: Sequence[str], headers: Tuple[np.ndarray, np.ndarray]):
+    global _scanner
+    _scanner = _ChunkScanner(path, motifs, headers)
+
+
+def _worker_chunk(chunk: Chunk) -> Tuple[np.ndarray, np.ndarray]:
+    return _scanner(chunk)
+
+
+def _chunks(size: int, chunk_size: int) -> List[Chunk]:
+    return [(first, min(first + chunk_size, size)) for first in range(0, size, chunk_size)]
+
+
+def scan_chunks(path: str, motifs: Sequence[str], chunk_size: int = 1 << 22,
+                processes: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield the matches of every chunk in file order, as an array of
+    positions and an array of the indices into motifs found there.
+
+    At most two chunks per process are in flight, so results stream out
+    in bounded memory however large the file is. processes defaults to
+    the number of CPUs; with 1 everything runs in this process.
+    """
+    if not motifs:
+        return
+    for motif in motifs:
+        if not 1 <= len(motif) <= 31 or (encode(motif) > 3).any():
+            raise ValueError(f'Motif {motif!r} must be 1 to 31 of the bases A, C, G and T.')
+    size: int = os.path.getsize(path)
+    if not size:
+        return
+    chunks: List[Chunk] = _chunks(size, chunk_size)
+    headers: Tuple[np.ndarray, np.ndarray] = _header_lines(path)
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(chunks) == 1:
+        scanner: _ChunkScanner = _ChunkScanner(path, motifs, headers)
+        try:
+            for chunk in chunks:
+                yield scanner(chunk)
+        finally:
+            scanner.close()
+        return
+
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(path, list(motifs), headers)) as pool:
+        pending: Deque[Future] = deque()
+        remaining: Iterator[Chunk] = iter(chunks)
+        for chunk in remaining:
+            pending.append(pool.submit(_worker_chunk, chunk))
+            if len(pending) >= 2 * processes:
+                break
+        while pending:
+            result: Tuple[np.ndarray, np.ndarray] = pending.popleft().result()
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append(pool.submit(_worker_chunk, chunk))
+            yield result
+
+
+def scan_file(path: str, motifs: Sequence[str], chunk_size: int = 1 << 22,
+              processes: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (position, motif) for every match in the file, in file order."""
+    for positions, numbers in scan_chunks(path, motifs, chunk_size, processes):
+        for position, number in zip(positions.tolist(), numbers.tolist()):
+            yield position, motifs[number]
+
+
+def count_matches(path: str, motifs: Sequence[str], chunk_size: int = 1 << 22,
+                  processes: Optional[int] = None) -> Dict[str, int]:
+    """Number of matches of every motif in the file."""
+    totals: np.ndarray = np.zeros(len(motifs), dtype=np.int64)
+    for _, numbers in scan_chunks(path, motifs, chunk_size, processes):
+        totals += np.bincount(numbers, minlength=len(motifs))
+    counts: Dict[str, int] = {}
+    for motif, total in zip(motifs, totals):
+        counts[motif] = counts.get(motif, 0) + int(total)  # Repeated motifs count once.
+    return counts
+
+
+if __name__ == "__main__":
+    from tempfile import TemporaryDirectory
+    from time import perf_counter
+
+    with TemporaryDirectory() as directory:
+        sequence_path: str = os.path.join(directory, 'genome.txt')
+        generator: np.random.Generator = np.random.default_rng(0)
+        with open(sequence_path, 'wb') as sequence_file:
+            for _ in range(4):
+                bases: np.ndarray = np.frombuffer(b'ACGT', dtype=np.uint8)[generator.integers(0, 4, 1 << 24)]
+                sequence_file.write(bases.tobytes())
+
+        codons: List[str] = [a + b + c for a in 'ACGT' for b in 'ACGT' for c in 'ACGT']
+        began: float = perf_counter()
+        counts: Dict[str, int] = count_matches(sequence_path, codons + ['GATTACA', 'ACGTACGTACGTACGT'])
+        seconds: float = perf_counter() - began
+        print(f'Scanned {os.path.getsize(sequence_path) / 1e6:.0f} MB for {len(counts)} motifs in '
+              f'{seconds:.2f} seconds ({os.path.getsize(sequence_path) / 1e6 / seconds:.0f} MB/s)')
+        print({motif: counts[motif] for motif in ('ACG', 'GATTACA', 'ACGTACGTACGTACGT')})
+
+        # A motif broken over blank lines at a chunk border, and one inside
+        # a FASTA header, which is not sequence.
+        fasta_path: str = os.path.join(directory, 'boundary.fa')
+        with open(fasta_path, 'wb') as fasta_file:
+            fasta_file.write(b'>chr1 GATTACA\nCCGAT\n\n\r\n\nTACACC\n>chr2\nGATTACA\n')
+        print(list(scan_file(fasta_path, ['GATTACA'], chunk_size=8)))
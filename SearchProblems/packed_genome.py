@@ -0,0 +1,296 @@
+"""Compact nucleotide sequences and k-mer lookup for large genomes.
+
+PackedSequence stores A, C, G and T in 2 bits each, four bases to a byte,
+so a 250 million base chromosome takes about 60 MB instead of the tens of
+GB of a list of codon tuples. Runs of anything else (N and the other
+IUPAC ambiguity codes) are kept as a short list of gaps.
+
+KmerIndex maps every k-mer to the sorted positions where it occurs, so
+containment and counts take O(1) time and listing the positions O(occ).
+K-mers overlapping a gap are left out.
+
+read_fasta streams records from a FASTA file a line at a time, so the
+text of a genome never has to fit in memory at once.
+"""
+from __future__ import annotations
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from SearchProblems.dna_search import Nucleotide, Codon
+
+BASES = 'ACGT'
+GAP = 4  # Code of any character other than A, C, G or T.
+
+# Code of every byte: A/a = 0, C/c = 1, G/g = 2, T/t = 3, anything else GAP.
+_CODES: np.ndarray = np.full(256, GAP, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    _CODES[ord(_base)] = _CODES[ord(_base.lower())] = _code
+
+Kmer = Union[str, Sequence[Nucleotide]]
+
+
+def encode(text: Union[str, bytes]) -> np.ndarray:
+    """Codes of every character of text, GAP for non-ACGT characters."""
+    if isinstance(text, str):
+        text = text.encode('ascii')
+    return _CODES[np.frombuffer(text, dtype=np.uint8)]
+
+
+def _pack(codes: np.ndarray) -> np.ndarray:
+    """Pack 2-bit codes four to a byte, first base in the lowest bits."""
+    padded: np.ndarray = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes & 3
+    quads: np.ndarray = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def _gap_runs(codes: np.ndarray, offset: int = 0) -> List[Tuple[int, int]]:
+    """Half-open (start, end) runs of GAP codes, shifted by offset."""
+    is_gap: np.ndarray = np.concatenate(([False], codes == GAP, [False]))
+    edges: np.ndarray = np.flatnonzero(is_gap[1:] != is_gap[:-1])
+    return [(int(start) + offset, int(end) + offset) for start, end in zip(edges[::2], edges[1::2])]
+
+
+def kmer_codes(codes: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """2-bit code of every k-mer of codes that avoids the gaps, with its start.
+
+    Codes of windows of width w are joined into width 2w by one shift and
+    OR, so building k-mers takes O(log k) passes over the sequence.
+    """
+    length: int = len(codes)
+    count: int = length - k + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    windows: np.ndarray = codes.astype(np.int64) & 3
+    width: int = 1
+    kmers: Optional[np.ndarray] = None
+    kmers_width: int = 0
+    remaining: int = k
+    while True:
+        if remaining & 1:
+            if kmers is None:
+                kmers, kmers_width = windows, width
+            else:
+                size: int = length - kmers_width - width + 1
+                kmers = (kmers[:size] << (2 * width)) | windows[kmers_width:kmers_width + size]
+                kmers_width += width
+        remaining >>= 1
+        if not remaining:
+            break
+        size = length - 2 * width + 1
+        windows = (windows[:size] << (2 * width)) | windows[width:width + size]
+        width *= 2
+    kmers = kmers[:count]
+
+    is_gap: np.ndarray = codes == GAP
+    if not is_gap.any():
+        return kmers, np.arange(count)
+    gap_counts: np.ndarray = np.concatenate(([0], np.cumsum(is_gap)))
+    clean: np.ndarray = gap_counts[k:] == gap_counts[:count]
+    return kmers[clean], np.flatnonzero(clean)
+
+
+class PackedSequence:
+    """A nucleotide sequence with 2 bits per base."""
+
+    def __init__(self, data: np.ndarray, length: int, gaps: Optional[List[Tuple[int, int]]] = None):
+        self.data: np.ndarray = data  # uint8, four bases per byte.
+        self._length: int = length
+        self.gaps: List[Tuple[int, int]] = gaps or []  # Sorted half-open runs of non-ACGT bases.
+
+    @classmethod
+    def from_string(cls, text: Union[str, bytes]) -> PackedSequence:
+        codes: np.ndarray = encode(text)
+        return cls(_pack(codes), len(codes), _gap_runs(codes))
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def codes(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Codes of the bases from start to stop, GAP inside gaps."""
+        stop = self._length if stop is None else min(stop, self._length)
+        if start >= stop:
+            return np.zeros(0, dtype=np.uint8)
+        first_byte: int = start // 4
+        packed: np.ndarray = self.data[first_byte:-(-stop // 4)]
+        unpacked: np.ndarray = ((packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).ravel()
+        codes: np.ndarray = unpacked[start - first_byte * 4:stop - first_byte * 4]
+        for gap_start, gap_end in self.gaps:
+            if gap_start < stop and gap_end > start:
+                codes[max(gap_start, start) - start:min(gap_end, stop) - start] = GAP
+        return codes
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            indices: range = range(*key.indices(self._length))
+            if not indices:
+                return ''
+            low: int = min(indices[0], indices[-1])
+            codes: np.ndarray = self.codes(low, max(indices[0], indices[-1]) + 1)
+            return _decode(codes[indices[0] - low::indices.step])
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('PackedSequence index out of range')
+        return _decode(self.codes(key, key + 1))
+
+    def __str__(self):
+        return _decode(self.codes())
+
+    def __repr__(self):
+        return f'PackedSequence({len(self)} bases, {len(self.gaps)} gaps)'
+
+
+def _decode(codes: np.ndarray) -> str:
+    return np.frombuffer(b'ACGTN', dtype=np.uint8)[codes].tobytes().decode('ascii')
+
+
+class PackedSequenceBuilder:
+    """Builds a PackedSequence from pieces of text of any length."""
+
+    def __init__(self):
+        self._packed: List[np.ndarray] = []
+        self._carry: np.ndarray = np.zeros(0, dtype=np.uint8)  # Fewer than 4 codes not packed yet.
+        self._length: int = 0
+        self._gaps: List[Tuple[int, int]] = []
+
+    def append(self, text: Union[str, bytes]):
+        codes: np.ndarray = encode(text)
+        for start, end in _gap_runs(codes, self._length):
+            if self._gaps and self._gaps[-1][1] == start:
+                start = self._gaps.pop()[0]  # The gap continues from the last piece.
+            self._gaps.append((start, end))
+        self._length += len(codes)
+
+        codes = np.concatenate((self._carry, codes))
+        whole: int = len(codes) // 4 * 4
+        if whole:
+            self._packed.append(_pack(codes[:whole]))
+        self._carry = codes[whole:]
+
+    def build(self) -> PackedSequence:
+        data: np.ndarray = np.concatenate(self._packed + [_pack(self._carry)])
+        return PackedSequence(data, self._length, self._gaps)
+
+
+def read_fasta(path: str) -> Iterator[Tuple[str, PackedSequence]]:
+    """Yield the name and sequence of every record in a FASTA file."""
+    name: Optional[str] = None
+    builder: Optional[PackedSequenceBuilder] = None
+    with open(path, 'rb') as file:
+        for line in file:
+            line = line.rstrip()
+            if line.startswith(b'>'):
+                if builder is not None:
+                    yield name, builder.build()
+                name = line[1:].decode().strip()
+                builder = PackedSequenceBuilder()
+            elif line and not line.startswith(b';'):
+                if builder is None:
+                    raise ValueError(f'{path} does not start with a FASTA header.')
+                builder.append(line)
+    if builder is not None:
+        yield name, builder.build()
+
+
+class KmerIndex:
+    """Positions of every k-mer of a PackedSequence.
+
+    For k up to DIRECT_K the k-mer's 2-bit code indexes an offset table
+    straight into the position list. Longer k-mers would need a table of
+    4^k entries, so their distinct codes are kept sorted instead and
+    looked up by binary search.
+    """
+    DIRECT_K = 12
+
+    def __init__(self, sequence: PackedSequence, k: int = 3):
+        if not 1 <= k <= 31:
+            raise ValueError('k must be between 1 and 31.')
+        self.sequence: PackedSequence = sequence
+        self.k: int = k
+        kmers, starts = kmer_codes(sequence.codes(), k)
+        position_type = np.uint32 if len(sequence) < 2 ** 32 else np.uint64
+        position_bits: int = max(len(sequence).bit_length(), 1)
+        if 2 * k + position_bits <= 63:
+            # Sorting (k-mer, position) packed into one integer is many
+            # times faster than a stable argsort of the k-mers.
+            keys: np.ndarray = np.sort((kmers << position_bits) | starts)
+            sorted_kmers: np.ndarray = keys >> position_bits
+            self.positions: np.ndarray = (keys & ((1 << position_bits) - 1)).astype(position_type)
+        else:
+            order: np.ndarray = np.argsort(kmers, kind='stable')
+            sorted_kmers = kmers[order]
+            self.positions = starts[order].astype(position_type)
+        if k <= self.DIRECT_K:
+            self._keys: Optional[np.ndarray] = None
+            self._offsets: np.ndarray = np.zeros(4 ** k + 1, dtype=np.int64)
+            np.cumsum(np.bincount(kmers, minlength=4 ** k), out=self._offsets[1:])
+        else:
+            self._keys, first = np.unique(sorted_kmers, return_index=True)
+            self._offsets = np.append(first, len(sorted_kmers)).astype(np.int64)
+
+    def encode(self, kmer: Kmer) -> Optional[int]:
+        """2-bit code of a k-mer given as a string or Nucleotides, None if
+        it contains anything other than A, C, G and T."""
+        if len(kmer) != self.k:
+            raise ValueError(f'Expected a {self.k}-mer, got {len(kmer)} bases.')
+        code: int = 0
+        for base in kmer:
+            value: int = BASES.find(base.upper()) if isinstance(base, str) else int(base) - 1
+            if value < 0:
+                return None
+            code = (code << 2) | value
+        return code
+
+    def _range(self, kmer: Kmer) -> Tuple[int, int]:
+        code: Optional[int] = self.encode(kmer)
+        if code is None:
+            return 0, 0
+        if self._keys is None:
+            return int(self._offsets[code]), int(self._offsets[code + 1])
+        slot: int = int(np.searchsorted(self._keys, code))
+        if slot == len(self._keys) or self._keys[slot] != code:
+            return 0, 0
+        return int(self._offsets[slot]), int(self._offsets[slot + 1])
+
+    def __contains__(self, kmer: Kmer) -> bool:
+        first, last = self._range(kmer)
+        return last > first
+
+    def count(self, kmer: Kmer) -> int:
+        first, last = self._range(kmer)
+        return last - first
+
+    def find_all(self, kmer: Kmer) -> np.ndarray:
+        """Sorted start positions of every occurrence."""
+        first, last = self._range(kmer)
+        return self.positions[first:last]
+
+
+def codon_index(sequence: PackedSequence) -> KmerIndex:
+    """Index of every codon, at any reading frame."""
+    return KmerIndex(sequence, 3)
+
+
+def contains_codon(index: KmerIndex, codon: Codon, frame: Optional[int] = 0) -> bool:
+    """Same question as dna_search.linear_search, answered from a codon
+    index: whether codon occurs in the given reading frame, or in any
+    frame if frame is None."""
+    if frame is None:
+        return codon in index
+    return bool(np.any(index.find_all(codon) % 3 == frame))
+
+
+if __name__ == "__main__":
+    from SearchProblems.dna_search import gene_str
+
+    genome = PackedSequence.from_string(gene_str + 'NNNN' + gene_str)
+    print(repr(genome), f'{genome.nbytes} bytes')
+    index = codon_index(genome)
+    acg: Codon = (Nucleotide.A, Nucleotide.C, Nucleotide.G)
+    gat: Codon = (Nucleotide.G, Nucleotide.A, Nucleotide.T)
+    print(contains_codon(index, acg), index.count('ACG'), index.find_all(acg))  # True
+    print(contains_codon(index, gat), contains_codon(index, gat, frame=None))  # False
@@ -0,0 +1,277 @@
+﻿"""Micro-benchmark runner for the SmallProblems implementations.
+
+Every case is warmed up, then its number of calls per run is calibrated
+so that a run lasts long enough for the clock to be trusted, like
+timeit's autorange. Several runs are timed and reported as the median
+time per call with its interquartile range, which unlike the mean hardly
+moves when the machine hiccups during one run.
+
+A case can have a reset hook, called before every call outside the timed
+region, to clear caches so every call does the full work. A prepare hook
+turns the benchmark argument into the function's input once, so building
+inputs is not timed either. Output of noisy functions can be discarded.
+
+Results can be written as JSON or CSV and plotted; matplotlib is only
+imported when plotting.
+
+    python benchmark.py fibonacci pi --json results.json --plot
+"""
+from __future__ import annotations
+import csv
+import json
+import statistics
+from contextlib import redirect_stdout, nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class _Discard:
+    """A file that forgets everything written to it."""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+@dataclass
+class Case:
+    """One implementation to benchmark."""
+    name: str
+    function: Callable[[Any], Any]
+    reset: Optional[Callable[[], None]] = None  # Called before every call, not timed.
+    prepare: Optional[Callable[[Any], Any]] = None  # Turns the argument into the input, not timed.
+    quiet: bool = False  # Discard what the function prints.
+
+
+@dataclass
+class BenchmarkResult:
+    """Seconds per call of one case for one argument."""
+    name: str
+    argument: Any
+    loops: int  # Calls per run.
+    times: List[float] = field(repr=False)  # Seconds per call of every run.
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def quartiles(self) -> Tuple[float, float]:
+        if len(self.times) < 2:
+            return self.times[0], self.times[0]
+        first, _, third = statistics.quantiles(self.times, n=4, method='inclusive')
+        return first, third
+
+    @property
+    def iqr(self) -> float:
+        first, third = self.quartiles
+        return third - first
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    def summary(self) -> Dict[str, Any]:
+        """The result as a flat dictionary, times left out."""
+        first, third = self.quartiles
+        return {'name': self.name, 'argument': self.argument, 'loops': self.loops,
+                'runs': len(self.times), 'median': self.median, 'q1': first, 'q3': third,
+                'iqr': self.iqr, 'best': self.best}
+
+    def __str__(self):
+        return (f'{self.name}({self.argument!r}): median {_format_time(self.median)}, '
+                f'IQR {_format_time(self.iqr)}, {len(self.times)} runs of {self.loops}')
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds / 1e-9:.3g} ns'
+
+
+def _time_calls(function: Callable[[Any], Any], value: Any, loops: int,
+                reset: Optional[Callable[[], None]]) -> float:
+    """Total seconds of loops calls, leaving the reset hook out."""
+    if reset is None:
+        began: float = perf_counter()
+        for _ in range(loops):
+            function(value)
+        return perf_counter() - began
+    total: float = 0.0
+    for _ in range(loops):
+        reset()
+        began = perf_counter()
+        function(value)
+        total += perf_counter() - began
+    return total
+
+
+def time_case(case: Case, argument: Any, runs: int = 7, min_run_time: float = 0.02,
+              warmup: int = 1) -> BenchmarkResult:
+    """Benchmark one case on one argument.
+
+    After warmup untimed calls the calls per run go up 1, 2, 5, 10, 20, ...
+    until one run lasts at least min_run_time, then runs runs are timed.
+    """
+    value: Any = case.prepare(argument) if case.prepare is not None else argument
+    with redirect_stdout(_Discard()) if case.quiet else nullcontext():
+        for _ in range(warmup):
+            if case.reset is not None:
+                case.reset()
+            case.function(value)
+
+        loops: int = 1
+        step: int = 0
+        while True:
+            elapsed: float = _time_calls(case.function, value, loops, case.reset)
+            if elapsed >= min_run_time:
+                break
+            loops = (1, 2, 5)[(step + 1) % 3] * 10 ** ((step + 1) // 3)
+            step += 1
+        times: List[float] = [elapsed / loops]
+        for _ in range(runs - 1):
+            times.append(_time_calls(case.function, value, loops, case.reset) / loops)
+    return BenchmarkResult(case.name, argument, loops, times)
+
+
+def run(cases: Sequence[Case], arguments: Iterable[Any], runs: int = 7, min_run_time: float = 0.02,
+        warmup: int = 1, report: Optional[Callable[[BenchmarkResult], None]] = print) -> List[BenchmarkResult]:
+    """Benchmark every case on every argument, reporting each result as
+    it comes in."""
+    results: List[BenchmarkResult] = []
+    for argument in arguments:
+        for case in cases:
+            result: BenchmarkResult = time_case(case, argument, runs, min_run_time, warmup)
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+
+def write_json(results: Sequence[BenchmarkResult], path: str):
+    with open(path, 'w') as file:
+        json.dump([dict(result.summary(), times=result.times) for result in results], file, indent=2,
+                  default=repr)
+
+
+def write_csv(results: Sequence[BenchmarkResult], path: str):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(BenchmarkResult('', None, 1, [0.0]).summary()))
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result.summary())
+
+
+def plot(results: Sequence[BenchmarkResult], path: Optional[str] = None, title: str = 'Benchmark'):
+    """Median time against argument per case, with the interquartile range
+    shaded. Saved to path if given, shown otherwise."""
+    import matplotlib.pyplot as plt
+
+    by_name: Dict[str, List[BenchmarkResult]] = {}
+    for result in results:
+        by_name.setdefault(result.name, []).append(result)
+    for name, series in by_name.items():
+        arguments: List[Any] = [result.argument for result in series]
+        plt.plot(arguments, [result.median for result in series], label=name)
+        plt.fill_between(arguments, [result.quartiles[0] for result in series],
+                         [result.quartiles[1] for result in series], alpha=0.25)
+    plt.legend()
+    plt.title(title)
+    plt.xlabel('argument')
+    plt.ylabel('seconds per call')
+    if path is not None:
+        plt.savefig(path)
+    else:
+        plt.show()
+
+
+def fibonacci_suite() -> Tuple[List[Case], List[int]]:
+    import fibonacci
+
+    memo = fibonacci.FibonacciCache()
+    return ([Case('recursive', fibonacci.fib),
+             Case('cached', fibonacci.cached_fib, reset=fibonacci.cache.clear),
+             Case('lru_cached', fibonacci.lru_cached_fib, reset=fibonacci.lru_cached_fib.cache_clear),
+             Case('iterative', fibonacci.iterative_fib),
+             Case('generator', fibonacci.fib_from_generator),
+             Case('fast doubling', fibonacci.fast_doubling_fib),
+             Case('exact fast doubling', fibonacci.exact_fib),
+             Case('matrix', fibonacci.matrix_fib),
+             Case('memo', memo, reset=memo.clear)],
+            [5, 10, 15, 20])
+
+
+def pi_suite() -> Tuple[List[Case], List[int]]:
+    from pi import calculate_pi, vectorized_pi
+
+    return [Case('leibniz', calculate_pi), Case('vectorized leibniz', vectorized_pi)], [1_000, 10_000, 100_000]
+
+
+def compression_suite() -> Tuple[List[Case], List[int]]:
+    from random import Random
+    from compression import compress_gene, decompress_gene
+    import gene_codec
+
+    def random_gene(length: int) -> str:
+        return ''.join(Random(length).choice('ACGT') for _ in range(length))
+
+    return ([Case('compress_gene', compress_gene, prepare=random_gene),
+             Case('decompress_gene', decompress_gene, prepare=lambda length: compress_gene(random_gene(length))),
+             Case('gene_codec.encode', gene_codec.encode, prepare=random_gene),
+             Case('gene_codec.decode', gene_codec.decode,
+                  prepare=lambda length: gene_codec.encode(random_gene(length)))],
+            [1_000, 10_000, 100_000])
+
+
+def hanoi_suite() -> Tuple[List[Case], List[int]]:
+    from towers_of_hanoi import TowersOfHanoi, Solver
+
+    def solve(discs: int):
+        Solver(TowersOfHanoi(number_of_discs=discs)).solve()
+
+    return [Case('recursive solver', solve, quiet=True)], [4, 8, 12]
+
+
+SUITES: Dict[str, Callable[[], Tuple[List[Case], List[Any]]]] = {
+    'fibonacci': fibonacci_suite,
+    'pi': pi_suite,
+    'compression': compression_suite,
+    'hanoi': hanoi_suite,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Benchmark the SmallProblems implementations.')
+    parser.add_argument('suites', nargs='*', help=f'suites to run out of {", ".join(SUITES)}, all by default')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--min-run-time', type=float, default=0.02, help='seconds')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--csv', help='write the results to this CSV file')
+    parser.add_argument('--plot', nargs='?', const='', help='plot, to this file if given')
+    arguments = parser.parse_args(argv)
+    for suite in arguments.suites:
+        if suite not in SUITES:
+            parser.error(f'unknown suite {suite!r}, choose from {", ".join(SUITES)}')
+
+    results: List[BenchmarkResult] = []
+    for suite in arguments.suites or list(SUITES):
+        print(f'{suite}:')
+        cases, suite_arguments = SUITES[suite]()
+        results += run(cases, suite_arguments, arguments.runs, arguments.min_run_time,
+                       report=lambda result: print(f'  {result}'))
+    if arguments.json:
+        write_json(results, arguments.json)
+    if arguments.csv:
+        write_csv(results, arguments.csv)
+    if arguments.plot is not None:
+        plot(results, arguments.plot or None)
+
+
+if __name__ == "__main__":
+    main()
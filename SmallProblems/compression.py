@@ -1,35 +1,27 @@
 ﻿from sys import getsizeof
+import numpy as np
+from gene_codec import EXCEPTION, base_codes, pack_bases, unpack_bases
 
 def compress_gene(gene: str) -> int:
-    """Compress a gene sequence down to an int using bitwise operations"""
-    bit_string: int = 1
-    for character in gene.upper():
-        bit_string <<= 2
-        if character == "A":
-            bit_string |= 0b00
-        elif character == "C":
-            bit_string |= 0b01
-        elif character == "G":
-            bit_string |= 0b10
-        elif character == "T":
-            bit_string |= 0b11
-    return bit_string
+    """Compress a gene sequence down to an int using bitwise operations.
+
+    The bases are packed into bytes by gene_codec and turned into one int
+    in a single step, so this takes linear time. Anything other than A, C,
+    G or T is stored as A.
+    """
+    codes: np.ndarray = base_codes(gene)
+    codes[codes == EXCEPTION] = 0
+    padding: int = -len(codes) % 4
+    bit_string: int = int.from_bytes(pack_bases(codes).tobytes(), 'big') >> (2 * padding)
+    return bit_string | (1 << (2 * len(codes)))  # The leading 1 marks the length.
 
 
 def decompress_gene(bit_string: int) -> str:
     """Decompresses an int back into a string"""
-    gene: str = ''
-    for i in range(0, len(bin(bit_string))-3, 2):
-        bits: int = bit_string >> i & 0b11
-        if bits == 0b00:
-            gene += "A"
-        if bits == 0b01:
-            gene += "C"
-        if bits == 0b10:
-            gene += "G"
-        if bits == 0b11:
-            gene += "T"
-    return gene[::-1]
+    length: int = (bit_string.bit_length() - 1) // 2
+    bit_string ^= 1 << (2 * length)
+    packed: bytes = (bit_string << (2 * (-length % 4))).to_bytes(-(-length // 4), 'big')
+    return unpack_bases(np.frombuffer(packed, dtype=np.uint8), 0, length).tobytes().decode('ascii')
 
 
 if __name__ == "__main__":
@@ -8,21 +8,23 @@ def random_key(length: int) -> int:
     return int.from_bytes(random_bytes, byteorder="big")
 
 
-def encrypt(data: str) -> Tuple[int, int]:
-    """Encrypt a string, returning the key and the encrypted data"""
+def encrypt(data: str) -> Tuple[int, int, int]:
+    """Encrypt a string, returning the key, the encrypted data and the
+    length in bytes of the encoded string, which decrypt needs because an
+    int cannot tell how many leading zero bytes the data had."""
     data_as_bytes: bytes = data.encode()
     encryption_key: int = random_key(len(data_as_bytes))
     data_key: int = int.from_bytes(data_as_bytes, byteorder="big")
     
     encrypted_data: int = data_key ^ encryption_key
     
-    return encryption_key, encrypted_data
+    return encryption_key, encrypted_data, len(data_as_bytes)
 
 
-def decrypt(encrypted_data: int, encryption_key: int) -> str:
-    """Decrypt data back into the original string using the key"""
+def decrypt(encrypted_data: int, encryption_key: int, length: int) -> str:
+    """Decrypt data of length bytes back into the original string using the key."""
     data_key: int = encrypted_data ^ encryption_key
-    data_as_bytes: bytes = data_key.to_bytes((data_key.bit_length() + 7) // 8, byteorder="big")
+    data_as_bytes: bytes = data_key.to_bytes(length, byteorder="big")
     data: str = data_as_bytes.decode()
     return data
 
@@ -31,9 +33,13 @@ if __name__ == "__main__":
     original_data = "Hello, Secret World!"
     print(f'Original data to be encrypted: {original_data!r}')
     
-    my_key, my_encrypted_data = encrypt(original_data)
+    my_key, my_encrypted_data, my_length = encrypt(original_data)
     print(f'\nData after encryption: {my_encrypted_data}')
     print(f'My secret key: {my_key}')
     
-    decrypted_data = decrypt(my_encrypted_data, my_key)
+    decrypted_data = decrypt(my_encrypted_data, my_key, my_length)
     print(f'\nDecrypted data using the secret key: {decrypted_data!r}')
+
+    leading_zeros = "\x00\x00Secret"
+    zeros_key, zeros_encrypted, zeros_length = encrypt(leading_zeros)
+    print(f'Leading zero bytes kept: {decrypt(zeros_encrypted, zeros_key, zeros_length) == leading_zeros}')
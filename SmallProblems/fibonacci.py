@@ -1,7 +1,8 @@
-﻿from typing import Dict, Callable, List, Tuple
-from timeit import timeit
+﻿from typing import Dict, List, Tuple, Iterator, Optional
+from collections import OrderedDict
 from functools import lru_cache
-import matplotlib.pyplot as plt
+from bisect import bisect_left, insort
+import os
 
 
 # A simple recursive fibonacci sequence. Not very efficient.
@@ -20,13 +21,12 @@ cache: Dict[int, int] = dict()
 def cached_fib(n: int) -> int:
     """Calculate the nth fibonacci number.
     
-    Store previous results in a cache.
+    Store previous results in a cache. The cache is filled upwards from
+    the last number in it, so large n cannot hit the recursion limit.
     """
-    if n not in cache:
-        if n < 2:
-            cache[n] = n
-        else:
-            cache[n] = cached_fib(n - 1) + cached_fib(n - 2)
+    while len(cache) <= n:
+        i: int = len(cache)
+        cache[i] = i if i < 2 else cache[i - 1] + cache[i - 2]
     return cache[n]
 
 
@@ -107,13 +107,155 @@ def fast_doubling_fib(n: int, result: Tuple[int, int] or None = None) -> Tuple[i
         return d, c + d
 
 
-def test_times(n: int, fib_func: Callable) -> List[int]:
-    """Creates an array of times it takes to run the function from 0 to n"""
-    times: List[int] = []
-    for i in range(n):
-        times.append(timeit(f'globals()["cache"] = dict(); lru_cached_fib.cache_clear(); {fib_func.__name__}({i});',
-                            number=10, globals=globals()) / 10)
-    return times
+def fib_pair(n: int) -> Tuple[int, int]:
+    """The exact fibonacci numbers n and n + 1, by fast doubling.
+
+    Walks the bits of n from the top, using
+    F(2k) = F(k) * (2F(k + 1) - F(k)) and F(2k + 1) = F(k)^2 + F(k + 1)^2,
+    so it takes O(log n) big integer multiplications and no recursion.
+    """
+    if n < 0:
+        raise ValueError('n must not be negative.')
+    a: int = 0
+    b: int = 1
+    for bit in bin(n)[2:] if n else ():
+        c: int = a * (2 * b - a)
+        d: int = a * a + b * b
+        a, b = (d, c + d) if bit == '1' else (c, d)
+    return a, b
+
+
+def exact_fib(n: int) -> int:
+    """Calculate the exact nth fibonacci number by fast doubling.
+
+    Same as fib_pair(n)[0], but skips working out F(n + 1) in the last
+    and most expensive step.
+    """
+    if n < 2:
+        if n < 0:
+            raise ValueError('n must not be negative.')
+        return n
+    a, b = fib_pair(n >> 1)
+    return a * a + b * b if n & 1 else a * (2 * b - a)
+
+
+def matrix_fib(n: int) -> int:
+    """Calculate the exact nth fibonacci number as [[1, 1], [1, 0]]^n.
+
+    Every power of the matrix is symmetric, [[F(k + 1), F(k)], [F(k), F(k - 1)]],
+    so only three entries are multiplied, in O(log n) squarings.
+    """
+    if n < 0:
+        raise ValueError('n must not be negative.')
+    # Result so far and the current square, each as (top left, off diagonal, bottom right).
+    r_a, r_b, r_c = 1, 0, 1
+    m_a, m_b, m_c = 1, 1, 0
+    while n:
+        if n & 1:
+            r_a, r_b, r_c = (r_a * m_a + r_b * m_b, r_a * m_b + r_b * m_c, r_b * m_b + r_c * m_c)
+        n >>= 1
+        if n:
+            m_b2: int = m_b * m_b
+            m_a, m_b, m_c = m_a * m_a + m_b2, m_b * (m_a + m_c), m_b2 + m_c * m_c
+    return r_b
+
+
+def fib_range(start: int, stop: int) -> Iterator[int]:
+    """Yield the fibonacci numbers start to stop - 1, like range().
+
+    The first two come from fib_pair and the rest from one addition
+    each, so a range of m numbers costs O(log start) multiplications and
+    m additions.
+    """
+    if start >= stop:
+        return
+    a, b = fib_pair(start)
+    for _ in range(start, stop):
+        yield a
+        a, b = b, a + b
+
+
+class FibonacciCache:
+    """Bounded memo of exact fibonacci numbers.
+
+    Keeps the pairs (F(n), F(n + 1)) of the last maxsize distinct n asked
+    for and evicts the least recently used. A request for n is answered
+    from the cached pair nearest below n if it is at most step_limit away,
+    walking up by additions, and by fast doubling otherwise. With a path
+    the memo is loaded from it when created and written by save(), as a
+    text file with a line "n F(n) F(n+1)" in hexadecimal per pair.
+    """
+
+    def __init__(self, maxsize: int = 1024, path: Optional[str] = None, step_limit: int = 64):
+        self.maxsize: int = maxsize
+        self.path: Optional[str] = path
+        self.step_limit: int = step_limit
+        self.hits: int = 0
+        self.misses: int = 0
+        self._pairs: OrderedDict[int, Tuple[int, int]] = OrderedDict()
+        self._keys: List[int] = []  # The cached n, sorted, to find the nearest one below.
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                for line_number, line in enumerate(file, start=1):
+                    fields: List[str] = line.split()
+                    if len(fields) != 3:
+                        raise ValueError(f'{path}:{line_number}: expected "n F(n) F(n+1)" in hexadecimal.')
+                    n, a, b = (int(field, 16) for field in fields)
+                    self._store(n, (a, b))
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def __contains__(self, n: int) -> bool:
+        return n in self._pairs
+
+    def _store(self, n: int, pair: Tuple[int, int]):
+        if n not in self._pairs:
+            insort(self._keys, n)
+        self._pairs[n] = pair
+        self._pairs.move_to_end(n)
+        while len(self._pairs) > self.maxsize:
+            evicted, _ = self._pairs.popitem(last=False)
+            del self._keys[bisect_left(self._keys, evicted)]
+
+    def pair(self, n: int) -> Tuple[int, int]:
+        """F(n) and F(n + 1)."""
+        pair: Optional[Tuple[int, int]] = self._pairs.get(n)
+        if pair is not None:
+            self.hits += 1
+            self._pairs.move_to_end(n)
+            return pair
+        self.misses += 1
+        index: int = bisect_left(self._keys, n)
+        if not index or self._keys[index - 1] < n - self.step_limit:
+            pair = fib_pair(n)
+        else:
+            below: int = self._keys[index - 1]
+            a, b = self._pairs[below]
+            for _ in range(n - below):
+                a, b = b, a + b
+            pair = a, b
+        if self.maxsize:
+            self._store(n, pair)
+        return pair
+
+    def __call__(self, n: int) -> int:
+        return self.pair(n)[0]
+
+    def clear(self):
+        self._pairs.clear()
+        self._keys.clear()
+
+    def save(self, path: Optional[str] = None):
+        """Write the memo, oldest first, to path or the path it was made with."""
+        path = path or self.path
+        if path is None:
+            raise ValueError('No path to save the cache to.')
+        temporary: str = path + '.tmp'
+        with open(temporary, 'w') as file:
+            for n, (a, b) in self._pairs.items():
+                file.write(f'{n:x} {a:x} {b:x}\n')
+        os.replace(temporary, path)
 
 
 # The graph shows the times for each of the 3 approaches.
@@ -125,19 +267,9 @@ def test_times(n: int, fib_func: Callable) -> List[int]:
 
 
 if __name__ == "__main__":
-    x_range = 300
-    cached_results: List[int] = test_times(x_range, cached_fib)
-    lru_cached_results: List[int] = test_times(x_range, lru_cached_fib)
-    iterative_results: List[int] = test_times(x_range, iterative_fib)
-    generator_results: List[int] = test_times(x_range, fib_from_generator)
-    fast_doubling_results: List[int] = test_times(x_range, fast_doubling_fib)
-
-    plt.plot(cached_results, label='cached')
-    plt.plot(lru_cached_results, label='lru_cached')
-    plt.plot(iterative_results, label='iterative')
-    plt.plot(generator_results, label='generator')
-    plt.plot(fast_doubling_results, label='fast doubling')
-    plt.legend()
-    plt.title('Speed of various fibonacci algorithms')
-    plt.xlabel(xlabel='n')
-    plt.ylabel(ylabel='seconds')
+    from benchmark import fibonacci_suite, run, plot
+
+    # The plain recursive fib is left out, it takes too long beyond n = 30.
+    cases = [case for case in fibonacci_suite()[0] if case.name != 'recursive']
+    plot(run(cases, range(0, 300, 10), runs=5, min_run_time=0.005, report=None),
+         title='Speed of various fibonacci algorithms')
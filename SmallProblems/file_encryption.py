@@ -0,0 +1,89 @@
+﻿"""One-time pad encryption of files of any size in constant memory.
+
+The file is read one fixed-size block at a time. Each block gets fresh
+random key bytes from the secrets module, which are XOR-ed into the block
+and appended to a key file as long as the data. Decryption reads the
+encrypted file and the key file block by block in step, so neither file
+is ever held in memory and, unlike the int based encrypt_image, leading
+zero bytes are kept.
+"""
+from secrets import token_bytes
+from typing import BinaryIO
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+
+
+def xor_into(data: memoryview, key: memoryview):
+    """XOR key into data in place; both must be the same length."""
+    np.bitwise_xor(np.frombuffer(data, dtype=np.uint8), np.frombuffer(key, dtype=np.uint8),
+                   out=np.frombuffer(data, dtype=np.uint8))
+
+
+def encrypt_stream(source: BinaryIO, target: BinaryIO, key_target: BinaryIO,
+                   chunk_size: int = CHUNK_SIZE) -> int:
+    """Encrypt source into target, writing the key to key_target.
+    Returns the number of bytes encrypted."""
+    buffer: bytearray = bytearray(chunk_size)
+    total: int = 0
+    while True:
+        size: int = source.readinto(buffer)
+        if not size:
+            return total
+        data: memoryview = memoryview(buffer)[:size]
+        key: bytes = token_bytes(size)
+        xor_into(data, memoryview(key))
+        target.write(data)
+        key_target.write(key)
+        total += size
+
+
+def decrypt_stream(source: BinaryIO, key_source: BinaryIO, target: BinaryIO,
+                   chunk_size: int = CHUNK_SIZE) -> int:
+    """Decrypt source with the key read from key_source into target.
+    Returns the number of bytes decrypted."""
+    buffer: bytearray = bytearray(chunk_size)
+    key_buffer: bytearray = bytearray(chunk_size)
+    total: int = 0
+    while True:
+        size: int = source.readinto(buffer)
+        if not size:
+            return total
+        key_size: int = key_source.readinto(memoryview(key_buffer)[:size])
+        while key_size < size:
+            more: int = key_source.readinto(memoryview(key_buffer)[key_size:size])
+            if not more:
+                raise ValueError(f'The key ends after {total + key_size} bytes, before the data.')
+            key_size += more
+        data: memoryview = memoryview(buffer)[:size]
+        xor_into(data, memoryview(key_buffer)[:size])
+        target.write(data)
+        total += size
+
+
+def encrypt_file(source_path: str, target_path: str, key_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """Encrypt a file, saving the encrypted data and the key as two files."""
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target, \
+            open(key_path, 'wb') as key_target:
+        return encrypt_stream(source, target, key_target, chunk_size)
+
+
+def decrypt_file(source_path: str, key_path: str, target_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """Decrypt a file encrypted by encrypt_file with its key file."""
+    with open(source_path, 'rb') as source, open(key_path, 'rb') as key_source, \
+            open(target_path, 'wb') as target:
+        return decrypt_stream(source, key_source, target, chunk_size)
+
+
+if __name__ == "__main__":
+    from os import path
+    from tempfile import TemporaryDirectory
+
+    with TemporaryDirectory() as directory:
+        encrypted_path: str = path.join(directory, 'original_image_encrypted.jpg')
+        key_path: str = path.join(directory, 'original_image.key')
+        decrypted_path: str = path.join(directory, 'original_image_decrypted.jpg')
+        size: int = encrypt_file('original_image.jpg', encrypted_path, key_path)
+        decrypt_file(encrypted_path, key_path, decrypted_path)
+        with open('original_image.jpg', 'rb') as original, open(decrypted_path, 'rb') as decrypted:
+            print(f'Decrypted {size} bytes, matches the original: {original.read() == decrypted.read()}')
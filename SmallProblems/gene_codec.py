@@ -0,0 +1,319 @@
+﻿"""Two bits per base gene compression in linear time.
+
+compress_gene in compression.py packs a gene into one Python int, which
+is shifted for every base and takes quadratic time. This codec packs four
+bases into each byte with NumPy table lookups, a chunk at a time, so
+files larger than memory can be encoded and decoded as streams.
+
+A packed gene is laid out as:
+
+    header      32 bytes: magic, version, number of bases, number of
+                exception runs
+    bases       four bases per byte, the first base in the highest bits
+    exceptions  start and length of every run of one repeated non-ACGT
+                byte (N, other IUPAC codes, line breaks), then the bytes
+
+Bases inside an exception run are packed as A and replaced when decoding,
+so a gene with long runs of N stays small. Lowercase a, c, g and t are
+stored as uppercase bases. PackedGene reads any base or slice straight
+from the packed bytes without decoding the rest.
+"""
+from __future__ import annotations
+import mmap
+import struct
+from io import BytesIO
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import numpy as np
+
+MAGIC = b'GENE'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ8x')  # magic, version, flags, bases, exception runs
+EXCEPTION = 255  # Code of bytes that are not a base.
+
+_LETTERS: np.ndarray = np.frombuffer(b'ACGT', dtype=np.uint8)
+_CODES: np.ndarray = np.full(256, EXCEPTION, dtype=np.uint8)
+for _code, _letter in enumerate('ACGT'):
+    _CODES[ord(_letter)] = _CODES[ord(_letter.lower())] = _code
+# The four letters packed in every possible byte, first base first.
+_UNPACKED: np.ndarray = _LETTERS[(np.arange(256, dtype=np.uint8)[:, None] >> np.array([6, 4, 2, 0],
+                                                                                      dtype=np.uint8)) & 3]
+
+
+def base_codes(text: Union[str, bytes]) -> np.ndarray:
+    """Code from 0 to 3 of every base of text, EXCEPTION for other bytes."""
+    if isinstance(text, str):
+        text = text.encode('ascii')
+    return _CODES[np.frombuffer(text, dtype=np.uint8)]
+
+
+def pack_bases(codes: np.ndarray) -> np.ndarray:
+    """Pack codes from 0 to 3 four to a byte, padding the end with A."""
+    padded: np.ndarray = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes & 3
+    quads: np.ndarray = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def unpack_bases(packed: np.ndarray, first: int, count: int) -> np.ndarray:
+    """Letters of count bases from base first of the packed bytes."""
+    first_byte: int = first // 4
+    last_byte: int = -(-(first + count) // 4)
+    letters: np.ndarray = _UNPACKED[packed[first_byte:last_byte]].ravel()
+    return letters[first - first_byte * 4:first - first_byte * 4 + count]
+
+
+def _exception_runs(raw: np.ndarray, codes: np.ndarray, offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Starts, lengths and bytes of the runs of one repeated non-base byte."""
+    positions: np.ndarray = np.flatnonzero(codes == EXCEPTION)
+    if not len(positions):
+        empty: np.ndarray = np.zeros(0, dtype=np.uint64)
+        return empty, empty, np.zeros(0, dtype=np.uint8)
+    symbols: np.ndarray = raw[positions]
+    new_run: np.ndarray = np.ones(len(positions), dtype=bool)
+    new_run[1:] = (np.diff(positions) != 1) | (symbols[1:] != symbols[:-1])
+    run_starts: np.ndarray = np.flatnonzero(new_run)
+    lengths: np.ndarray = np.diff(np.append(run_starts, len(positions)))
+    return ((positions[run_starts] + offset).astype(np.uint64), lengths.astype(np.uint64),
+            symbols[run_starts])
+
+
+class _ExceptionTable:
+    """Exception runs collected while encoding, spooled to temporary files
+    so only the last run, which the next chunk may continue, is held in
+    memory."""
+
+    def __init__(self):
+        self._files: List[BinaryIO] = [TemporaryFile(), TemporaryFile(), TemporaryFile()]
+        self._last: Optional[Tuple[int, int, int]] = None  # Start, length and byte of the last run.
+        self.count: int = 0
+
+    def add(self, starts: np.ndarray, lengths: np.ndarray, symbols: np.ndarray):
+        if not len(starts):
+            return
+        if self._last is not None:
+            last_start, last_length, last_symbol = self._last
+            if last_start + last_length == starts[0] and last_symbol == symbols[0]:
+                starts, lengths = starts.copy(), lengths.copy()
+                starts[0] = last_start
+                lengths[0] += last_length
+            else:
+                self._spool(*(np.array([value]) for value in self._last))
+        self._spool(starts[:-1], lengths[:-1], symbols[:-1])
+        self._last = (int(starts[-1]), int(lengths[-1]), int(symbols[-1]))
+
+    def _spool(self, starts: np.ndarray, lengths: np.ndarray, symbols: np.ndarray):
+        for file, part, dtype in zip(self._files, (starts, lengths, symbols), ('<u8', '<u8', 'u1')):
+            file.write(part.astype(dtype).tobytes())
+        self.count += len(starts)
+
+    def write(self, target: BinaryIO):
+        if self._last is not None:
+            self._spool(*(np.array([value]) for value in self._last))
+            self._last = None
+        for file in self._files:
+            file.seek(0)
+            copyfileobj(file, target)
+
+    def close(self):
+        for file in self._files:
+            file.close()
+
+
+def encode_stream(source: BinaryIO, target: BinaryIO, chunk_size: int = 1 << 22) -> int:
+    """Encode the gene text read from source into target, which must be
+    seekable so the header can be filled in at the end. Returns the
+    number of bases."""
+    chunk_size = max(4, chunk_size - chunk_size % 4)  # Every chunk but the last fills whole bytes.
+    header_position: int = target.tell()
+    target.write(bytes(HEADER.size))
+    exceptions: _ExceptionTable = _ExceptionTable()
+    length: int = 0
+    try:
+        while True:
+            chunk: bytes = source.read(chunk_size)
+            if not chunk:
+                break
+            raw: np.ndarray = np.frombuffer(chunk, dtype=np.uint8)
+            codes: np.ndarray = _CODES[raw]
+            exceptions.add(*_exception_runs(raw, codes, length))
+            target.write(pack_bases(codes).tobytes())
+            length += len(chunk)
+            if len(chunk) % 4:
+                if source.read(1):
+                    raise ValueError('source returned a short read before its end.')
+                break
+        exceptions.write(target)
+    finally:
+        exceptions.close()
+    end: int = target.tell()
+    target.seek(header_position)
+    target.write(HEADER.pack(MAGIC, VERSION, 0, length, exceptions.count))
+    target.seek(end)
+    return length
+
+
+def encode(gene: Union[str, bytes]) -> bytes:
+    """Packed bytes of a gene string."""
+    if isinstance(gene, str):
+        gene = gene.encode('ascii')
+    target: BytesIO = BytesIO()
+    encode_stream(BytesIO(gene), target)
+    return target.getvalue()
+
+
+class PackedGene:
+    """Random access to the bases of packed gene bytes, which may be a
+    memory-mapped file."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        magic, version, _, length, exception_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a packed gene.')
+        if version != VERSION:
+            raise ValueError(f'Unsupported packed gene version {version}.')
+        self._data = data
+        self._length: int = length
+        body_size: int = -(-length // 4)
+        self.packed: np.ndarray = np.frombuffer(data, dtype=np.uint8, count=body_size, offset=HEADER.size)
+        table: int = HEADER.size + body_size
+        # Views into data, so a memory-mapped table is paged in as it is searched.
+        self.exception_starts: np.ndarray = np.frombuffer(data, dtype='<u8', count=exception_count,
+                                                          offset=table)
+        self.exception_lengths: np.ndarray = np.frombuffer(data, dtype='<u8', count=exception_count,
+                                                           offset=table + 8 * exception_count)
+        self.exception_symbols: np.ndarray = np.frombuffer(data, dtype=np.uint8, count=exception_count,
+                                                           offset=table + 16 * exception_count)
+        self._file: Optional[BinaryIO] = None
+
+    @classmethod
+    def from_string(cls, gene: Union[str, bytes]) -> PackedGene:
+        return cls(encode(gene))
+
+    @classmethod
+    def open(cls, path: str) -> PackedGene:
+        """Memory-map a file written by encode_file."""
+        file: BinaryIO = open(path, 'rb')
+        gene: PackedGene = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        gene._file = file
+        return gene
+
+    def close(self):
+        if self._file is not None:
+            del self.packed, self.exception_starts, self.exception_lengths, self.exception_symbols
+            self._data.close()
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def letters(self, start: int, stop: int) -> np.ndarray:
+        """Bytes of the bases from start to stop."""
+        letters: np.ndarray = unpack_bases(self.packed, start, stop - start)
+        # The runs overlapping start to stop: the last one starting at or
+        # before start if it reaches past it, and those starting after.
+        first: int = max(int(np.searchsorted(self.exception_starts, start, side='right')) - 1, 0)
+        if first < len(self.exception_starts) and self._run_end(first) <= start:
+            first += 1
+        last: int = int(np.searchsorted(self.exception_starts, stop, side='left'))
+        if first < last:
+            letters = letters.copy()
+            for run in range(first, last):
+                run_start: int = max(int(self.exception_starts[run]), start)
+                run_end: int = min(self._run_end(run), stop)
+                letters[run_start - start:run_end - start] = self.exception_symbols[run]
+        return letters
+
+    def _run_end(self, run: int) -> int:
+        return int(self.exception_starts[run]) + int(self.exception_lengths[run])
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            indices: range = range(*key.indices(self._length))
+            if not indices:
+                return ''
+            low: int = min(indices[0], indices[-1])
+            letters: np.ndarray = self.letters(low, max(indices[0], indices[-1]) + 1)
+            return letters[indices[0] - low::indices.step].tobytes().decode('ascii')
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('PackedGene index out of range')
+        return self.letters(key, key + 1).tobytes().decode('ascii')
+
+    def __str__(self):
+        return self[:]
+
+
+def decode(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Gene string of packed bytes."""
+    return str(PackedGene(data))
+
+
+def decode_stream(source: BinaryIO, target: BinaryIO, chunk_size: int = 1 << 22) -> int:
+    """Write the gene text of the packed gene in source, which must be
+    seekable, to target. Returns the number of bases."""
+    start: int = source.tell()
+    magic, version, _, length, exception_count = HEADER.unpack(source.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('Not a packed gene.')
+    if version != VERSION:
+        raise ValueError(f'Unsupported packed gene version {version}.')
+    body: int = start + HEADER.size
+    runs: Iterator[Tuple[int, int, int]] = _read_exceptions(source, body + -(-length // 4), exception_count,
+                                                            max(chunk_size // 16, 1))
+    run: Optional[Tuple[int, int, int]] = next(runs, None)
+    chunk_bytes: int = max(chunk_size // 4, 1)
+    position: int = 0
+    while position < length:
+        source.seek(body + position // 4)
+        packed: np.ndarray = np.frombuffer(source.read(chunk_bytes), dtype=np.uint8)
+        count: int = min(len(packed) * 4, length - position)
+        letters: np.ndarray = _UNPACKED[packed].ravel()[:count]
+        end: int = position + count
+        while run is not None and run[0] < end:
+            run_start, run_end, symbol = run
+            letters[max(run_start, position) - position:min(run_end, end) - position] = symbol
+            if run_end > end:
+                break  # The run continues into the next chunk.
+            run = next(runs, None)
+        target.write(letters.tobytes())
+        position = end
+    return length
+
+
+def _read_exceptions(source: BinaryIO, table: int, count: int, window: int) -> Iterator[Tuple[int, int, int]]:
+    """Start, end and byte of every exception run of the table at offset
+    table of source, read window runs at a time."""
+    for first in range(0, count, window):
+        runs: int = min(window, count - first)
+        source.seek(table + 8 * first)
+        starts: np.ndarray = np.frombuffer(source.read(8 * runs), dtype='<u8').astype(np.int64)
+        source.seek(table + 8 * (count + first))
+        ends: np.ndarray = starts + np.frombuffer(source.read(8 * runs), dtype='<u8').astype(np.int64)
+        source.seek(table + 16 * count + first)
+        symbols: np.ndarray = np.frombuffer(source.read(runs), dtype=np.uint8)
+        yield from zip(starts.tolist(), ends.tolist(), symbols.tolist())
+
+
+def encode_file(source_path: str, target_path: str, chunk_size: int = 1 << 22) -> int:
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        return encode_stream(source, target, chunk_size)
+
+
+def decode_file(source_path: str, target_path: str, chunk_size: int = 1 << 22) -> int:
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        return decode_stream(source, target, chunk_size)
+
+
+if __name__ == "__main__":
+    from sys import getsizeof
+
+    original_gene = 'AGTGCCCAAGTCGATAAAAAGAGAATTCAAGGTGTTTGCCGAG' + 'N' * 1000 + 'ACGT' * 1000
+    packed_gene = PackedGene.from_string(original_gene)
+    assert decode(encode(original_gene)) == original_gene
+    print(f'Original gene size: {getsizeof(original_gene)}')
+    print(f'Packed gene size: {len(encode(original_gene))}')
+    print(f'Bases 40 to 50: {packed_gene[40:50]!r}, last base: {packed_gene[-1]!r}')
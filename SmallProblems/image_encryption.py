@@ -6,7 +6,8 @@ def encrypt_image(file_name: str) -> int:
     
     The new file will be the original file name + '_encrypted.jpg'
     
-    Returns the encryption key.
+    Returns the encryption key. The whole image is held in memory as
+    ints, see file_encryption for files of any size.
     """
     with open(file_name + '.jpg', 'rb') as image:
         data: bytes = image.read()
@@ -15,8 +16,8 @@ def encrypt_image(file_name: str) -> int:
     data_key: int = int.from_bytes(data, byteorder="big")
 
     encrypted_data: int = data_key ^ encryption_key
-    encrypted_data_as_bytes: bytes = encrypted_data.to_bytes(
-        (encrypted_data.bit_length() + 7) // 8, 'big')
+    # Sized by the input, bit_length() would drop leading zero bytes.
+    encrypted_data_as_bytes: bytes = encrypted_data.to_bytes(len(data), 'big')
     with open(file_name + '_encrypted.jpg', 'wb') as image_out:
         image_out.write(encrypted_data_as_bytes)
     print(f'Saved encrypted image as "{file_name}_encrypted.jpg"')
@@ -29,7 +30,7 @@ def decrypt_image(file_name: str, encryption_key: int):
         encrypted_data: bytes = image.read()
     encrypted_data_as_int: int = int.from_bytes(encrypted_data, 'big')
     data_key: int = encrypted_data_as_int ^ encryption_key
-    data_as_bytes: bytes = data_key.to_bytes((data_key.bit_length() + 7) // 8, byteorder="big")
+    data_as_bytes: bytes = data_key.to_bytes(len(encrypted_data), byteorder="big")
 
     with open(file_name + '_decrypted.jpg', 'wb') as image_out:
         image_out.write(data_as_bytes)
@@ -1,8 +1,26 @@
-﻿"""A game of Towers of Hanoi along with a solver class that solves it."""
+﻿"""A game of Towers of Hanoi along with a solver class that solves it.
 
-from typing import TypeVar, Generic, List
+The Solver plays every move on the game, which logs it. For large games
+the moves of the optimal three tower solution can instead be computed
+from the move number alone: move m moves disc ctz(m) + 1 (the number of
+trailing zero bits of m, plus one) from tower (m & (m - 1)) % 3 to tower
+((m | (m - 1)) + 1) % 3, with the towers numbered so the discs end on
+tower 2 for an odd number of discs and on tower 1 for an even number.
+hanoi_moves streams these moves, hanoi_move_chunks computes them with
+NumPy and pack_moves stores them in half a byte each. ArrayTowers plays
+them without a log, and state_after gives the tower of every disc after
+any move without playing the ones before it.
+
+With four or more towers FrameStewart splits off the smallest discs,
+moves them aside using every tower, moves the rest with one tower fewer
+and moves the small ones back on top, with the split that a table of
+move counts shows to be cheapest.
+"""
+
+from typing import TypeVar, Generic, Iterator, List, Optional, Sequence, Tuple
 from string import ascii_uppercase
 import math
+import numpy as np
 
 T = TypeVar('T')
 
@@ -78,7 +96,7 @@ class TowersOfHanoi:
     
     def victory_check(self):
         """Check whether all discs are on the final tower."""
-        if all(tower.is_empty() for tower in self.towers[:-1]):
+        if len(self.towers[-1].stack) == self.number_of_discs:
             print(f'Solved {self.number_of_discs} disc game in {self.moves} moves')
             self.print_move_log()
             
@@ -95,7 +113,13 @@ class Solver:
         self.copy_game: TowersOfHanoi = game.copy()
         
     def solve(self):
-        """Solve the current game."""
+        """Solve the current game. With more than three towers all of them
+        are used, by the Frame-Stewart algorithm, and the discs end on the
+        last tower."""
+        if len(self.game.towers) > 3:
+            for from_tower, to_tower in FrameStewart(len(self.game.towers)).moves(self.game.number_of_discs):
+                self.game.move_disc(from_tower, to_tower)
+            return
         self.hanoi(self.copy_game.towers[0], self.copy_game.towers[2], self.copy_game.towers[1],
                    self.copy_game.number_of_discs)
     
@@ -110,7 +134,231 @@ class Solver:
             self.hanoi(temp, end, begin, n - 1)
         
 
+def _tower_order(number_of_discs: int, begin: int, end: int, temp: int) -> Tuple[int, int, int]:
+    """The towers numbered 0, 1 and 2 by the move formulas."""
+    return (begin, temp, end) if number_of_discs & 1 else (begin, end, temp)
+
+
+def hanoi_moves(number_of_discs: int, begin: int = 0, end: int = 2, temp: int = 1) -> Iterator[Tuple[int, int]]:
+    """Yield (from tower, to tower) for every move of the optimal solution,
+    without recursion and in constant memory."""
+    order: Tuple[int, int, int] = _tower_order(number_of_discs, begin, end, temp)
+    for m in range(1, 1 << number_of_discs):
+        yield order[(m & (m - 1)) % 3], order[((m | (m - 1)) + 1) % 3]
+
+
+def hanoi_move_chunks(number_of_discs: int, start: int = 0, stop: Optional[int] = None,
+                      chunk_size: int = 1 << 20, begin: int = 0, end: int = 2,
+                      temp: int = 1) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield the moves start to stop (counted from 0) of the optimal
+    solution as arrays of from towers and to towers, chunk_size moves at
+    a time. Up to 62 discs."""
+    if not 0 <= number_of_discs <= 62:
+        raise ValueError('Move arrays support 0 to 62 discs.')
+    order: np.ndarray = np.array(_tower_order(number_of_discs, begin, end, temp), dtype=np.uint8)
+    stop = (1 << number_of_discs) - 1 if stop is None else min(stop, (1 << number_of_discs) - 1)
+    for first in range(start, stop, chunk_size):
+        m: np.ndarray = np.arange(first + 1, min(first + chunk_size, stop) + 1, dtype=np.int64)
+        yield order[(m & (m - 1)) % 3], order[((m | (m - 1)) + 1) % 3]
+
+
+def moved_discs(moves: np.ndarray) -> np.ndarray:
+    """The disc moved by each of the moves (counted from 0) of the optimal
+    solution, 1 being the smallest: the trailing zero bits of m + 1, plus one."""
+    m: np.ndarray = np.asarray(moves, dtype=np.int64) + 1
+    return np.frexp((m & -m).astype(np.float64))[1].astype(np.int64)
+
+
+def pack_moves(from_towers: np.ndarray, to_towers: np.ndarray) -> bytearray:
+    """Store moves between the first 4 towers in half a byte each, the
+    from tower in the upper 2 bits of the nibble, earlier moves in the
+    lower nibble."""
+    nibbles: np.ndarray = (np.asarray(from_towers, dtype=np.uint8) << 2) | np.asarray(to_towers, dtype=np.uint8)
+    if len(nibbles) & 1:
+        nibbles = np.append(nibbles, np.uint8(0))
+    return bytearray((nibbles[0::2] | (nibbles[1::2] << 4)).tobytes())
+
+
+def unpack_moves(packed: bytes, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The from and to towers of the first count moves stored by pack_moves."""
+    data: np.ndarray = np.frombuffer(packed, dtype=np.uint8)
+    nibbles: np.ndarray = np.empty(2 * len(data), dtype=np.uint8)
+    nibbles[0::2] = data & 0x0F
+    nibbles[1::2] = data >> 4
+    nibbles = nibbles[:count]
+    return nibbles >> 2, nibbles & 3
+
+
+def packed_hanoi_moves(number_of_discs: int, chunk_size: int = 1 << 20) -> bytearray:
+    """The whole optimal solution packed by pack_moves, 2^(n-1) bytes."""
+    packed: bytearray = bytearray()
+    for from_towers, to_towers in hanoi_move_chunks(number_of_discs, chunk_size=chunk_size & ~1 or 2):
+        packed += pack_moves(from_towers, to_towers)
+    return packed
+
+
+def state_after(number_of_discs: int, moves: int, begin: int = 0, end: int = 2, temp: int = 1) -> List[int]:
+    """The tower of every disc, smallest first, after the given number of
+    moves of the optimal solution, without playing them.
+
+    Disc d (0 for the smallest) first moves at move 2^d and then every
+    2^(d+1) moves, always a step around the towers in the same direction,
+    forwards when number_of_discs - d is even and backwards when it is odd.
+    """
+    if not 0 <= moves < 1 << number_of_discs:
+        raise ValueError(f'A {number_of_discs} disc game has {(1 << number_of_discs) - 1} moves.')
+    towers: Tuple[int, int, int] = (begin, temp, end)
+    state: List[int] = []
+    for disc in range(number_of_discs):
+        times_moved: int = (moves + (1 << disc)) >> (disc + 1)
+        direction: int = 1 if (number_of_discs - disc) % 2 == 0 else -1
+        state.append(towers[direction * times_moved % 3])
+    return state
+
+
+class ArrayTowers:
+    """Towers of Hanoi kept as the tower of every disc in a NumPy array,
+    without a move log or a victory check after every move."""
+
+    def __init__(self, number_of_towers: int = 3, number_of_discs: int = 3):
+        self.number_of_towers: int = number_of_towers
+        self.number_of_discs: int = number_of_discs
+        self.discs: np.ndarray = np.zeros(number_of_discs, dtype=np.uint8)  # Tower of disc i + 1.
+        self.moves: int = 0
+
+    def __repr__(self):
+        return '\n'.join(f'Tower {letter}: {stack}' for stack, letter in zip(self.stacks(), ascii_uppercase))
+
+    def stacks(self) -> List[List[int]]:
+        """The discs on every tower, bottom first, like Tower.stack."""
+        stacks: List[List[int]] = [[] for _ in range(self.number_of_towers)]
+        for disc in range(self.number_of_discs, 0, -1):
+            stacks[self.discs[disc - 1]].append(disc)
+        return stacks
+
+    def top(self, tower: int) -> float:
+        """The smallest disc on the tower, infinity if it is empty."""
+        on_tower: np.ndarray = np.flatnonzero(self.discs == tower)
+        return int(on_tower[0]) + 1 if len(on_tower) else math.inf
+
+    def move_disc(self, from_tower: int, to_tower: int):
+        """Move disc from one tower to another."""
+        disc: float = self.top(from_tower)
+        if disc == math.inf:
+            raise ValueError('There is no disc to move.')
+        if disc > self.top(to_tower):
+            raise ValueError('Disc cannot be placed on disc of smaller value.')
+        self.discs[disc - 1] = to_tower
+        self.moves += 1
+
+    def play_solution(self, stop: Optional[int] = None, chunk_size: int = 1 << 20,
+                      begin: int = 0, end: int = 2, temp: int = 1):
+        """Play the optimal solution from the current move up to move stop,
+        all of it by default, a chunk of moves at a time. The game must be
+        where the solution has left it after self.moves moves."""
+        total: int = (1 << self.number_of_discs) - 1
+        stop = total if stop is None else min(stop, total)
+        for first in range(self.moves, stop, chunk_size):
+            last: int = min(first + chunk_size, stop)
+            _, to_towers = next(hanoi_move_chunks(self.number_of_discs, first, last, last - first,
+                                                  begin, end, temp))
+            discs: np.ndarray = moved_discs(np.arange(first, last, dtype=np.int64)) - 1
+            # Only the last move of each disc in the chunk decides its tower.
+            moved, last_index = np.unique(discs[::-1], return_index=True)
+            self.discs[moved] = to_towers[::-1][last_index]
+            self.moves = last
+
+    def is_solved(self, end: Optional[int] = None) -> bool:
+        """Whether all discs are on the end tower, the last by default."""
+        return bool((self.discs == (self.number_of_towers - 1 if end is None else end)).all())
+
+
+class FrameStewart:
+    """Frame-Stewart solutions for a number of towers, with the tables of
+    the fewest moves and the best split for every number of discs and
+    towers computed once and grown as larger games are asked for."""
+
+    def __init__(self, number_of_towers: int = 4):
+        if number_of_towers < 3:
+            raise ValueError('Towers of Hanoi needs at least 3 towers.')
+        self.number_of_towers: int = number_of_towers
+        # Row k - 3 holds the move counts and splits for k towers, by discs.
+        self._counts: List[List[int]] = [[0] for _ in range(number_of_towers - 2)]
+        self._splits: List[List[int]] = [[0] for _ in range(number_of_towers - 2)]
+
+    def _grow(self, number_of_discs: int, number_of_towers: int) -> int:
+        """Extend the tables to number_of_discs discs and number_of_towers
+        towers, returning the row for those towers."""
+        if number_of_towers < 3:
+            raise ValueError('Towers of Hanoi needs at least 3 towers.')
+        if number_of_discs < 0:
+            raise ValueError('The number of discs must not be negative.')
+        while len(self._counts) < number_of_towers - 2:
+            self._counts.append([0])
+            self._splits.append([0])
+        for discs in range(len(self._counts[0]), number_of_discs + 1):
+            self._counts[0].append((1 << discs) - 1)
+            self._splits[0].append(discs - 1)
+        for row in range(1, number_of_towers - 2):
+            counts: List[int] = self._counts[row]
+            fewer: List[int] = self._counts[row - 1]
+            for discs in range(len(counts), number_of_discs + 1):
+                best: int = 0
+                best_count: int = fewer[discs]
+                for split in range(1, discs):
+                    count: int = 2 * counts[split] + fewer[discs - split]
+                    if count < best_count:
+                        best, best_count = split, count
+                counts.append(best_count)
+                self._splits[row].append(best)
+        return number_of_towers - 3
+
+    def move_count(self, number_of_discs: int, number_of_towers: Optional[int] = None) -> int:
+        """Number of moves of the Frame-Stewart solution, for the towers
+        of this solver unless another number is given."""
+        row: int = self._grow(number_of_discs, number_of_towers or self.number_of_towers)
+        return self._counts[row][number_of_discs]
+
+    def split(self, number_of_discs: int, number_of_towers: Optional[int] = None) -> int:
+        """How many of the smallest discs are moved aside first."""
+        row: int = self._grow(number_of_discs, number_of_towers or self.number_of_towers)
+        return self._splits[row][number_of_discs]
+
+    def moves(self, number_of_discs: int, begin: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Yield (from tower, to tower) for every move of the solution
+        from begin to end, the last tower by default.
+
+        Pending sub-problems are kept on an explicit stack of at most a
+        few entries per disc, and three tower sub-problems are streamed
+        by hanoi_moves, so memory does not grow with the number of moves.
+        """
+        end = self.number_of_towers - 1 if end is None else end
+        self._grow(number_of_discs, self.number_of_towers)
+        others: List[int] = [tower for tower in range(self.number_of_towers) if tower not in (begin, end)]
+        # Entries are (discs, towers): move from towers[0] to towers[1] using the rest.
+        stack: List[Tuple[int, Sequence[int]]] = [(number_of_discs, (begin, end, *others))]
+        while stack:
+            discs, towers = stack.pop()
+            if discs == 0:
+                continue
+            if discs == 1:
+                yield towers[0], towers[1]
+            elif len(towers) == 3:
+                yield from hanoi_moves(discs, *towers)
+            else:
+                split: int = self._splits[len(towers) - 3][discs]
+                source, target, aside, *rest = towers
+                stack.append((split, (aside, target, source, *rest)))
+                stack.append((discs - split, (source, target, *rest)))
+                stack.append((split, (source, aside, target, *rest)))
+
+
 if __name__ == "__main__":
     game = TowersOfHanoi(number_of_discs=5)
     solver = Solver(game)
     solver.solve()
+
+    four_towers = TowersOfHanoi(number_of_towers=4, number_of_discs=5)
+    Solver(four_towers).solve()
+
+    print(f'Moves for 200 discs on 6 towers: {FrameStewart(6).move_count(200)}')